@@ -3,11 +3,21 @@ Flask API for Model Registry
 Provides REST API for model management, deployment, and monitoring
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+import atexit
+import itertools
 import logging
 import os
+import queue
+import orjson
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from api.serialization import OrjsonProvider, format_metrics, stream_json_array
+from api import validation
+from api.middleware import StaticResponseMiddleware
+from api.validation import RequestValidationError
 from storage.database import init_database
 from models.gemini_model import GeminiModel
 from models.model_loader import ModelLoader
@@ -25,12 +35,40 @@ from tracking.alerting import AlertingSystem
 # Load environment variables
 load_dotenv()
 
+
+def _configure_logging():
+    """
+    Route log records through a queue so request threads never block on I/O
+    
+    Returns:
+        Started QueueListener, or None if logging was already configured
+    """
+    root = logging.getLogger()
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    
+    if root.handlers:
+        return None
+    
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    
+    log_queue = queue.Queue(-1)
+    root.addHandler(QueueHandler(log_queue))
+    
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    
+    return listener
+
+
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+log_listener = _configure_logging()
 logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
 # Initialize database
 db_path = os.getenv('DATABASE_PATH', 'model_registry.db')
@@ -40,57 +78,78 @@ init_database(db_path)
 model_registry = ModelRegistry(db_path)
 version_manager = VersionManager()
 metadata_store = MetadataStore(db_path)
-deployment_manager = DeploymentManager(db_path)
+model_loader = ModelLoader()
 health_checker = HealthChecker()
-rollback_manager = RollbackManager(db_path)
+# Blue-green and canary deployments gate traffic shifts on real health checks
+deployment_manager = DeploymentManager(db_path, health_checker=health_checker, model_loader=model_loader)
 snapshot_manager = SnapshotManager(db_path)
+rollback_manager = RollbackManager(db_path, snapshot_manager=snapshot_manager)
 performance_tracker = PerformanceTracker(db_path)
 metrics_collector = MetricsCollector(db_path)
 alerting_system = AlertingSystem(db_path)
-model_loader = ModelLoader()
+
+# Background executor for work that should not block responses
+background_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='background')
+
+# List results shorter than this are sent whole rather than streamed
+STREAM_MIN_ITEMS = 100
+
+
+# Static response bodies, serialized once at import
+INDEX_BODY = orjson.dumps({
+    'message': 'Model Registry API',
+    'version': '1.0.0',
+    'features': [
+        'Model Registry',
+        'Version Control',
+        'Deployment Automation',
+        'Rollback Mechanisms',
+        'Performance Tracking'
+    ],
+    'endpoints': {
+        'models': '/api/models',
+        'versions': '/api/models/{name}/versions',
+        'deploy': '/api/models/{name}/deploy',
+        'rollback': '/api/models/{name}/rollback',
+        'metrics': '/api/models/{name}/metrics'
+    }
+})
+HEALTH_BODY = orjson.dumps({'status': 'healthy'})
+
+# Answer load balancer probes and the index without routing or dispatch
+app.wsgi_app = StaticResponseMiddleware(app.wsgi_app, {
+    '/': INDEX_BODY,
+    '/health': HEALTH_BODY
+})
 
 
 @app.route('/')
 def index():
     """Root endpoint"""
-    return jsonify({
-        'message': 'Model Registry API',
-        'version': '1.0.0',
-        'features': [
-            'Model Registry',
-            'Version Control',
-            'Deployment Automation',
-            'Rollback Mechanisms',
-            'Performance Tracking'
-        ],
-        'endpoints': {
-            'models': '/api/models',
-            'versions': '/api/models/{name}/versions',
-            'deploy': '/api/models/{name}/deploy',
-            'rollback': '/api/models/{name}/rollback',
-            'metrics': '/api/models/{name}/metrics'
-        }
-    })
+    return Response(INDEX_BODY, mimetype='application/json')
 
 
 @app.route('/health')
 def health():
     """Health check"""
-    return jsonify({'status': 'healthy'})
+    return Response(HEALTH_BODY, mimetype='application/json')
+
+
+@app.errorhandler(RequestValidationError)
+def handle_validation_error(e):
+    """Reject malformed request bodies"""
+    return jsonify({'error': str(e)}), 400
 
 
 @app.route('/api/models/register', methods=['POST'])
 def register_model():
     """Register a new model"""
-    data = request.get_json()
-    
-    if not data or 'name' not in data:
-        return jsonify({'error': 'Model name required'}), 400
+    data = validation.REGISTER_MODEL.parse(request.get_data())
     
     try:
         model_id = model_registry.register_model(
             data['name'],
-            data.get('description', '')
+            data['description']
         )
         
         return jsonify({
@@ -109,11 +168,7 @@ def list_models():
     """List all models"""
     try:
         models = model_registry.list_models()
-        return jsonify({
-            'status': 'success',
-            'models': models,
-            'count': len(models)
-        })
+        return _stream_response('models', models)
     except Exception as e:
         logger.error(f"Error listing models: {e}")
         return jsonify({'error': str(e)}), 500
@@ -122,17 +177,14 @@ def list_models():
 @app.route('/api/models/<model_name>/versions/register', methods=['POST'])
 def register_version(model_name):
     """Register a model version"""
-    data = request.get_json()
-    
-    if not data or 'version' not in data:
-        return jsonify({'error': 'Version required'}), 400
+    data = validation.REGISTER_VERSION.parse(request.get_data())
     
     try:
         version_id = model_registry.register_version(
             model_name,
             data['version'],
-            data.get('status', 'active'),
-            data.get('metadata')
+            data['status'],
+            data['metadata']
         )
         
         return jsonify({
@@ -152,12 +204,7 @@ def list_versions(model_name):
     """List all versions for a model"""
     try:
         versions = model_registry.list_versions(model_name)
-        return jsonify({
-            'status': 'success',
-            'model': model_name,
-            'versions': versions,
-            'count': len(versions)
-        })
+        return _stream_response('versions', versions, model=model_name)
     except Exception as e:
         logger.error(f"Error listing versions: {e}")
         return jsonify({'error': str(e)}), 500
@@ -166,28 +213,34 @@ def list_versions(model_name):
 @app.route('/api/models/<model_name>/deploy', methods=['POST'])
 def deploy_model(model_name):
     """Deploy a model version"""
-    data = request.get_json()
-    
-    if not data or 'version' not in data:
-        return jsonify({'error': 'Version required'}), 400
+    data = validation.DEPLOY.parse(request.get_data())
     
     try:
         deployment_id = deployment_manager.deploy(
             model_name,
             data['version'],
-            data.get('strategy', 'direct')
+            data['strategy']
         )
         
-        # Create snapshot
-        snapshot_id = snapshot_manager.create_snapshot(deployment_id)
+        # Capture the state now so the snapshot matches this deployment;
+        # only the write happens in the background
+        snapshot_data = snapshot_manager.capture_snapshot(deployment_id)
+        if snapshot_data is not None:
+            future = background_executor.submit(snapshot_manager.store_snapshot, snapshot_data)
+            future.add_done_callback(_log_snapshot_error)
+        
+        # Drop superseded versions and warm the cache for the deployed one
+        model_loader.invalidate(model_name, keep=data['version'])
+        background_executor.submit(_preload_model, model_name, data['version'])
         
         return jsonify({
             'status': 'success',
             'deployment_id': deployment_id,
-            'snapshot_id': snapshot_id,
+            'snapshot_status': 'pending',
+            'snapshots': f'/api/deployments/{deployment_id}/snapshots',
             'model': model_name,
             'version': data['version'],
-            'strategy': data.get('strategy', 'direct')
+            'strategy': data['strategy']
         })
         
     except Exception as e:
@@ -195,13 +248,44 @@ def deploy_model(model_name):
         return jsonify({'error': str(e)}), 500
 
 
+def _stream_response(key, items, **fields):
+    """
+    Build a JSON response for a list endpoint, streaming only large results
+    
+    The first rows are fetched before the response starts, so a failing
+    query (or any failure in a small result) still becomes a 500 instead
+    of a truncated 200 body.
+    """
+    items = iter(items)
+    first = list(itertools.islice(items, STREAM_MIN_ITEMS))
+    
+    if len(first) < STREAM_MIN_ITEMS:
+        body = b''.join(stream_json_array(key, first, **fields))
+        return Response(body, mimetype='application/json')
+    
+    body = stream_json_array(key, itertools.chain(first, items), **fields)
+    return Response(stream_with_context(body), mimetype='application/json')
+
+
+def _preload_model(model_name, version):
+    """Load a model into the shared cache ahead of its first prediction"""
+    try:
+        model_loader.load_model(model_name, version)
+    except Exception as e:
+        logger.warning(f"Could not preload model {model_name}:{version}: {e}")
+
+
+def _log_snapshot_error(future):
+    """Log failures from background snapshot creation"""
+    error = future.exception()
+    if error:
+        logger.error(f"Error creating snapshot: {error}")
+
+
 @app.route('/api/models/<model_name>/predict', methods=['POST'])
 def predict(model_name):
     """Make prediction with model"""
-    data = request.get_json()
-    
-    if not data or 'input' not in data:
-        return jsonify({'error': 'Input required'}), 400
+    data = validation.PREDICT.parse(request.get_data())
     
     try:
         # Get active deployment
@@ -212,11 +296,15 @@ def predict(model_name):
         
         version = deployment['version']
         
-        # Load model
-        model = model_loader.load_model(model_name, version)
+        # Predict with the shared, cached model instance
+        try:
+            model = model_loader.load_model(model_name, version)
+            result = model.predict(data['input'])
+        except Exception:
+            rollback_manager.record_outcome(model_name, version, success=False)
+            raise
         
-        # Make prediction
-        result = model.predict(data['input'])
+        rollback_manager.record_outcome(model_name, version, success=True)
         
         # Track performance
         performance_tracker.track_prediction(
@@ -242,10 +330,10 @@ def predict(model_name):
 @app.route('/api/models/<model_name>/rollback', methods=['POST'])
 def rollback_model(model_name):
     """Rollback model to previous version"""
-    data = request.get_json() or {}
+    data = validation.ROLLBACK.parse(request.get_data())
     
     try:
-        if 'version' in data:
+        if data['version'] is not None:
             # Rollback to specific version
             success = rollback_manager.rollback_to_version(model_name, data['version'])
             version = data['version']
@@ -254,6 +342,8 @@ def rollback_model(model_name):
             version = rollback_manager.rollback_to_previous(model_name)
             success = version is not None
         
+        deployment_manager.invalidate_active_deployment(model_name)
+        
         if success:
             return jsonify({
                 'status': 'success',
@@ -285,7 +375,7 @@ def get_metrics(model_name):
         
         return jsonify({
             'status': 'success',
-            'metrics': metrics
+            'metrics': format_metrics(metrics)
         })
         
     except Exception as e:
@@ -310,7 +400,7 @@ def compare_versions(model_name):
         
         return jsonify({
             'status': 'success',
-            'comparison': comparison
+            'comparison': format_metrics(comparison)
         })
         
     except Exception as e:
@@ -325,16 +415,32 @@ def list_deployments():
     limit = int(request.args.get('limit', 10))
     
     try:
-        deployments = deployment_manager.list_deployments(model_name, limit)
+        deployments = deployment_manager.iter_deployments(model_name, limit)
+        
+        return _stream_response('deployments', deployments)
+        
+    except Exception as e:
+        logger.error(f"Error listing deployments: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/deployments/<int:deployment_id>/snapshots', methods=['GET'])
+def list_deployment_snapshots(deployment_id):
+    """List snapshots for a deployment"""
+    limit = int(request.args.get('limit', 10))
+    
+    try:
+        snapshots = snapshot_manager.list_snapshots(deployment_id, limit)
         
         return jsonify({
             'status': 'success',
-            'deployments': deployments,
-            'count': len(deployments)
+            'deployment_id': deployment_id,
+            'snapshots': snapshots,
+            'count': len(snapshots)
         })
         
     except Exception as e:
-        logger.error(f"Error listing deployments: {e}")
+        logger.error(f"Error listing snapshots: {e}")
         return jsonify({'error': str(e)}), 500
 
 
@@ -349,11 +455,7 @@ def get_alerts():
     try:
         alerts = alerting_system.get_alerts(model_name, version, severity, limit)
         
-        return jsonify({
-            'status': 'success',
-            'alerts': alerts,
-            'count': len(alerts)
-        })
+        return _stream_response('alerts', alerts)
         
     except Exception as e:
         logger.error(f"Error getting alerts: {e}")
@@ -374,6 +476,11 @@ if __name__ == '__main__':
     print("  - Deployment Automation")
     print("  - Rollback Mechanisms")
     print("  - Performance Tracking")
+    print("For production, run: gunicorn -k gthread --threads 8 wsgi:app")
     print("=" * 60)
     
-    app.run(host='0.0.0.0', port=port, debug=debug)
+    # The built-in server is for development only
+    if debug:
+        app.run(host='0.0.0.0', port=port, debug=debug, threaded=True)
+    else:
+        print("DEBUG is off: start the app with gunicorn instead")
@@ -0,0 +1,36 @@
+"""
+Middleware
+WSGI middleware wrapped around the Flask application
+"""
+
+
+class StaticResponseMiddleware:
+    """
+    Serve fixed response bodies for selected paths before Flask dispatch
+    """
+
+    def __init__(self, wsgi_app, routes):
+        """
+        Initialize middleware
+
+        Args:
+            wsgi_app: Wrapped WSGI application
+            routes: Mapping of path to pre-serialized JSON body (bytes)
+        """
+        self.wsgi_app = wsgi_app
+        self.routes = {
+            path: (body, [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+            for path, body in routes.items()
+        }
+
+    def __call__(self, environ, start_response):
+        """Answer GET/HEAD for static paths, pass everything else through"""
+        route = self.routes.get(environ.get('PATH_INFO'))
+        method = environ.get('REQUEST_METHOD')
+
+        if route is None or method not in ('GET', 'HEAD'):
+            return self.wsgi_app(environ, start_response)
+
+        body, headers = route
+        start_response('200 OK', list(headers))
+        return [body] if method == 'GET' else []
@@ -0,0 +1,113 @@
+"""
+Serialization
+Fast JSON encoding for API responses
+"""
+
+import sqlite3
+
+import orjson
+from flask.json.provider import JSONProvider
+
+
+# Display precision of tracker metric fields. The tracker returns exact
+# values; they are rounded only when sent to API clients
+METRIC_PRECISION = {
+    'avg_latency': 3,
+    'min_latency': 3,
+    'max_latency': 3,
+    'avg_tokens': 1,
+    'success_rate': 2,
+    'performance_score': 3,
+    'latency_diff': 3,
+    'tokens_diff': 1,
+    'success_rate_diff': 2
+}
+
+
+def format_metrics(metrics):
+    """
+    Round metric values to their display precision
+    
+    Args:
+        metrics: Metrics or comparison dictionary (nested dictionaries are
+            formatted too)
+        
+    Returns:
+        New dictionary with rounded values
+    """
+    formatted = {}
+    for name, value in metrics.items():
+        if isinstance(value, dict):
+            value = format_metrics(value)
+        elif isinstance(value, float) and name in METRIC_PRECISION:
+            value = round(value, METRIC_PRECISION[name])
+        formatted[name] = value
+    return formatted
+
+
+def _default(obj):
+    """Encode types orjson does not handle natively"""
+    if isinstance(obj, sqlite3.Row):
+        return dict(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson
+    """
+    
+    def dumps(self, obj, **kwargs):
+        """
+        Serialize object to a JSON string
+        
+        Args:
+            obj: Object to serialize
+            **kwargs: Ignored (accepted for Flask compatibility)
+            
+        Returns:
+            JSON string
+        """
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        """
+        Deserialize JSON string or bytes
+        
+        Args:
+            s: JSON string or bytes
+            **kwargs: Ignored (accepted for Flask compatibility)
+            
+        Returns:
+            Deserialized object
+        """
+        return orjson.loads(s)
+
+
+def stream_json_array(key, items, **fields):
+    """
+    Stream a success response whose array is encoded one item at a time
+    
+    Produces {"status": "success", **fields, key: [...], "count": N}
+    without building the whole array or document in memory.
+    
+    Args:
+        key: Name of the array field
+        items: Iterable of JSON-serializable items or sqlite3.Row objects
+        **fields: Extra top-level fields emitted before the array
+        
+    Yields:
+        JSON fragments as bytes
+    """
+    head = b'{"status":"success",'
+    for name, value in fields.items():
+        head += orjson.dumps(name) + b':' + orjson.dumps(value) + b','
+    yield head + orjson.dumps(key) + b':['
+    
+    count = 0
+    for item in items:
+        prefix = b',' if count else b''
+        yield prefix + orjson.dumps(item, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        count += 1
+    
+    yield b'],"count":' + str(count).encode() + b'}'
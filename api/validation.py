@@ -0,0 +1,104 @@
+"""
+Request Validation
+Decode and validate JSON request bodies in one pass
+"""
+
+import orjson
+
+
+class RequestValidationError(ValueError):
+    """Raised when a request body does not match its schema"""
+
+
+class RequestSchema:
+    """
+    Declarative schema for a JSON object request body
+    """
+
+    def __init__(self, required=None, optional=None, missing_message=None, non_empty=None):
+        """
+        Initialize request schema
+
+        Args:
+            required: Mapping of required field name to accepted type(s)
+            optional: Mapping of optional field name to (accepted type(s), default)
+            missing_message: Error message when a required field is absent
+            non_empty: Names of fields whose value must not be empty
+        """
+        self.required = dict(required or {})
+        self.optional = dict(optional or {})
+        self.missing_message = missing_message
+        self.non_empty = frozenset(non_empty or ())
+
+        # Field checks are resolved once so parsing is a single loop
+        self._fields = [(name, types, True, None) for name, types in self.required.items()]
+        self._fields += [(name, types, False, default) for name, (types, default) in self.optional.items()]
+
+    def parse(self, body):
+        """
+        Decode a request body and validate it against the schema
+
+        Args:
+            body: Raw request body (bytes)
+
+        Returns:
+            Dictionary with declared fields only, defaults applied
+        """
+        try:
+            data = orjson.loads(body) if body else {}
+        except orjson.JSONDecodeError:
+            raise RequestValidationError('Invalid JSON body')
+
+        if data is None:
+            data = {}
+
+        if not isinstance(data, dict):
+            raise RequestValidationError('JSON object required')
+
+        result = {}
+
+        for name, types, required, default in self._fields:
+            if name not in data:
+                if required:
+                    raise RequestValidationError(self.missing_message or f"Field '{name}' required")
+                result[name] = default
+                continue
+
+            value = data[name]
+            if types is not None and not isinstance(value, types):
+                raise RequestValidationError(f"Field '{name}' has invalid type")
+            if not value and name in self.non_empty:
+                raise RequestValidationError(f"Field '{name}' must not be empty")
+            result[name] = value
+
+        return result
+
+
+# Request schemas for API endpoints
+REGISTER_MODEL = RequestSchema(
+    required={'name': str},
+    optional={'description': (str, '')},
+    missing_message='Model name required'
+)
+
+REGISTER_VERSION = RequestSchema(
+    required={'version': str},
+    optional={'status': (str, 'active'), 'metadata': ((dict, type(None)), None)},
+    missing_message='Version required'
+)
+
+DEPLOY = RequestSchema(
+    required={'version': str},
+    optional={'strategy': (str, 'direct')},
+    missing_message='Version required'
+)
+
+PREDICT = RequestSchema(
+    required={'input': str},
+    missing_message='Input required',
+    non_empty={'input'}
+)
+
+ROLLBACK = RequestSchema(
+    optional={'version': (str, None)}
+)
@@ -4,8 +4,10 @@ Manage model deployments with different strategies
 """
 
 import logging
+import time
 from datetime import datetime
-from storage.database import get_connection
+from storage.database import get_pooled_connection
+from registry.model_registry import get_version_id
 from deployment.deployment_strategy import DirectDeployment, BlueGreenDeployment, CanaryDeployment
 
 logger = logging.getLogger(__name__)
@@ -16,19 +18,45 @@ class DeploymentManager:
     Manage model deployments
     """
     
-    def __init__(self, db_path='model_registry.db'):
+    _SQL_GET_ACTIVE_DEPLOYMENT = '''
+        SELECT d.*, v.version
+        FROM deployments d
+        JOIN versions v ON d.version_id = v.id
+        JOIN models m ON v.model_id = m.id
+        WHERE m.name = ? AND d.status = 'completed'
+        ORDER BY d.deployed_at DESC, d.id DESC
+        LIMIT 1
+    '''
+    
+    _SQL_GET_DEPLOYMENT = '''
+        SELECT d.*, v.version, m.name as model_name
+        FROM deployments d
+        JOIN versions v ON d.version_id = v.id
+        JOIN models m ON v.model_id = m.id
+        WHERE d.id = ?
+    '''
+    
+    def __init__(self, db_path='model_registry.db', active_cache_ttl=2.0,
+                 health_checker=None, model_loader=None):
         """
         Initialize deployment manager
         
         Args:
             db_path: Path to database file
+            active_cache_ttl: Seconds to cache active deployment lookups
+            health_checker: Optional HealthChecker used by gated strategies
+            model_loader: ModelLoader used with health_checker
         """
         self.db_path = db_path
+        self.active_cache_ttl = active_cache_ttl
+        self._active_cache = {}
         self.strategies = {
             'direct': DirectDeployment(),
-            'blue-green': BlueGreenDeployment(),
-            'canary': CanaryDeployment()
+            'blue-green': BlueGreenDeployment(health_checker, model_loader),
+            'canary': CanaryDeployment(health_checker, model_loader)
         }
+        # Resolve strategy dispatch once instead of per deploy
+        self._deploy_fns = {name: (s.deploy, s.waits_for_health) for name, s in self.strategies.items()}
         logger.info("Deployment manager initialized")
     
     def deploy(self, model_name, version, strategy='direct'):
@@ -43,76 +71,88 @@ class DeploymentManager:
         Returns:
             Deployment ID
         """
-        if strategy not in self.strategies:
+        entry = self._deploy_fns.get(strategy)
+        if entry is None:
             raise ValueError(f"Unknown strategy: {strategy}")
+        deploy_fn, waits_for_health = entry
         
         # Get version ID
-        version_id = self._get_version_id(model_name, version)
+        version_id = get_version_id(self.db_path, model_name, version)
         if not version_id:
             raise ValueError(f"Version not found: {model_name} v{version}")
         
-        # Create deployment record
-        deployment_id = self._create_deployment(version_id, strategy)
+        conn = get_pooled_connection(self.db_path)
         
-        # Execute deployment strategy
-        deployment_strategy = self.strategies[strategy]
-        success = deployment_strategy.deploy(model_name, version, deployment_id, self.db_path)
+        # Health-gated strategies commit in short steps so their waits never
+        # hold the write lock; the others commit once
+        run = self._deploy_in_steps if waits_for_health else self._deploy_in_one_transaction
+        try:
+            deployment_id, success = run(conn, deploy_fn, model_name, version, version_id, strategy)
+        finally:
+            self.invalidate_active_deployment(model_name)
         
-        # Update deployment status
         if success:
-            self._update_deployment_status(deployment_id, 'completed')
-            logger.info(f"Deployment completed: {model_name} v{version} ({strategy})")
+            logger.info("Deployment completed: %s v%s (%s)", model_name, version, strategy)
         else:
-            self._update_deployment_status(deployment_id, 'failed')
-            logger.error(f"Deployment failed: {model_name} v{version}")
+            logger.error("Deployment failed: %s v%s", model_name, version)
         
         return deployment_id
     
-    def _get_version_id(self, model_name, version):
-        """Get version ID from database"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.id FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
+    def _deploy_in_one_transaction(self, conn, deploy_fn, model_name, version, version_id, strategy):
+        """
+        Run a strategy that never waits in one BEGIN IMMEDIATE transaction
         
-        result = cursor.fetchone()
-        conn.close()
+        The record, traffic writes and status commit together (one fsync);
+        any exception rolls back the whole deployment.
+        """
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            deployment_id = self._create_deployment(conn, version_id, strategy)
+            success = deploy_fn(model_name, version, deployment_id, self.db_path)
+            self._update_deployment_status(conn, deployment_id, 'completed' if success else 'failed')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
         
-        return result['id'] if result else None
+        return deployment_id, success
     
-    def _create_deployment(self, version_id, strategy):
-        """Create deployment record"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+    def _deploy_in_steps(self, conn, deploy_fn, model_name, version, version_id, strategy):
+        """
+        Run a health-gated strategy in short transactions
+        
+        The strategy's health waits run between commits without holding
+        the write lock.
+        """
+        with conn:
+            deployment_id = self._create_deployment(conn, version_id, strategy)
         
-        cursor.execute('''
+        success = False
+        try:
+            success = deploy_fn(model_name, version, deployment_id, self.db_path)
+        finally:
+            # Update deployment status (failed if the strategy raised)
+            with conn:
+                self._update_deployment_status(conn, deployment_id, 'completed' if success else 'failed')
+        
+        return deployment_id, success
+    
+    def _create_deployment(self, conn, version_id, strategy):
+        """Create deployment record in the caller's transaction"""
+        cursor = conn.execute('''
             INSERT INTO deployments (version_id, strategy, status)
             VALUES (?, ?, 'pending')
         ''', (version_id, strategy))
         
-        deployment_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return deployment_id
+        return cursor.lastrowid
     
-    def _update_deployment_status(self, deployment_id, status):
-        """Update deployment status"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+    def _update_deployment_status(self, conn, deployment_id, status):
+        """Update deployment status in the caller's transaction"""
+        conn.execute('''
             UPDATE deployments
             SET status = ?, completed_at = CURRENT_TIMESTAMP
             WHERE id = ?
         ''', (status, deployment_id))
-        
-        conn.commit()
-        conn.close()
     
     def get_deployment(self, deployment_id):
         """
@@ -124,19 +164,11 @@ class DeploymentManager:
         Returns:
             Deployment dictionary
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
-        cursor.execute('''
-            SELECT d.*, v.version, m.name as model_name
-            FROM deployments d
-            JOIN versions v ON d.version_id = v.id
-            JOIN models m ON v.model_id = m.id
-            WHERE d.id = ?
-        ''', (deployment_id,))
+        cursor.execute(self._SQL_GET_DEPLOYMENT, (deployment_id,))
         
         result = cursor.fetchone()
-        conn.close()
         
         return dict(result) if result else None
     
@@ -149,10 +181,24 @@ class DeploymentManager:
             limit: Number of records
             
         Returns:
-            List of deployment dictionaries
+            List of deployment rows (sqlite3.Row)
+        """
+        return list(self.iter_deployments(model_name, limit))
+    
+    def iter_deployments(self, model_name=None, limit=10):
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        Iterate deployments without materializing the full list
+        
+        The query runs immediately; rows are fetched as the result is consumed.
+        
+        Args:
+            model_name: Optional model name filter
+            limit: Number of records
+            
+        Returns:
+            Iterator of deployment rows (sqlite3.Row)
+        """
+        cursor = get_pooled_connection(self.db_path).cursor()
         
         if model_name:
             cursor.execute('''
@@ -161,7 +207,7 @@ class DeploymentManager:
                 JOIN versions v ON d.version_id = v.id
                 JOIN models m ON v.model_id = m.id
                 WHERE m.name = ?
-                ORDER BY d.deployed_at DESC
+                ORDER BY d.deployed_at DESC, d.id DESC
                 LIMIT ?
             ''', (model_name, limit))
         else:
@@ -170,14 +216,11 @@ class DeploymentManager:
                 FROM deployments d
                 JOIN versions v ON d.version_id = v.id
                 JOIN models m ON v.model_id = m.id
-                ORDER BY d.deployed_at DESC
+                ORDER BY d.deployed_at DESC, d.id DESC
                 LIMIT ?
             ''', (limit,))
         
-        results = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in results]
+        return cursor
     
     def get_active_deployment(self, model_name):
         """
@@ -189,20 +232,29 @@ class DeploymentManager:
         Returns:
             Active deployment dictionary or None
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cached = self._active_cache.get(model_name)
+        if cached and time.monotonic() - cached[0] < self.active_cache_ttl:
+            return dict(cached[1]) if cached[1] else None
+        
+        cursor = get_pooled_connection(self.db_path).cursor()
         
-        cursor.execute('''
-            SELECT d.*, v.version
-            FROM deployments d
-            JOIN versions v ON d.version_id = v.id
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND d.status = 'completed'
-            ORDER BY d.deployed_at DESC
-            LIMIT 1
-        ''', (model_name,))
+        cursor.execute(self._SQL_GET_ACTIVE_DEPLOYMENT, (model_name,))
         
         result = cursor.fetchone()
-        conn.close()
+        deployment = dict(result) if result else None
         
-        return dict(result) if result else None
+        self._active_cache[model_name] = (time.monotonic(), deployment)
+        
+        return dict(deployment) if deployment else None
+    
+    def invalidate_active_deployment(self, model_name=None):
+        """
+        Drop cached active deployment lookups
+        
+        Args:
+            model_name: Model to invalidate (all models if None)
+        """
+        if model_name is None:
+            self._active_cache.clear()
+        else:
+            self._active_cache.pop(model_name, None)
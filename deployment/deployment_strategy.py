@@ -5,7 +5,9 @@ Different deployment strategies: Direct, Blue-Green, Canary
 
 import logging
 import time
-from storage.database import get_connection
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from storage.database import get_pooled_connection
+from registry.model_registry import get_version_id
 
 logger = logging.getLogger(__name__)
 
@@ -13,10 +15,42 @@ logger = logging.getLogger(__name__)
 class DeploymentStrategy:
     """Base class for deployment strategies"""
     
+    # Strategies that poll health between traffic changes must not run
+    # inside one long transaction
+    waits_for_health = True
+    
+    _SQL_UPSERT_TRAFFIC = '''
+        INSERT INTO traffic (version_id, percentage)
+        VALUES (?, ?)
+        ON CONFLICT(version_id) DO UPDATE
+        SET percentage = excluded.percentage, updated_at = CURRENT_TIMESTAMP
+    '''
+    
+    def __init__(self, health_checker=None, model_loader=None, health_timeout=5.0):
+        """
+        Initialize deployment strategy
+        
+        Args:
+            health_checker: Optional HealthChecker used to gate traffic shifts
+            model_loader: ModelLoader used with health_checker to load the model
+            health_timeout: Seconds to wait for a version to become healthy
+        """
+        self.health_checker = health_checker
+        self.model_loader = model_loader
+        self.health_timeout = health_timeout
+        
+        # Probes run here so a hung probe cannot outlast health_timeout
+        self._probe_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='health-probe')
+    
     def deploy(self, model_name, version, deployment_id, db_path):
         """
         Deploy model
         
+        Each traffic change is committed on its own and health waits run
+        between them with no transaction open, so the database write lock
+        is never held while polling a model. If the caller already holds a
+        transaction on the pooled connection, the writes join it instead.
+        
         Args:
             model_name: Model name
             version: Version to deploy
@@ -26,62 +60,98 @@ class DeploymentStrategy:
         Returns:
             True if successful
         """
+        conn = get_pooled_connection(db_path)
+        
+        # Resolve the version ID once per deployment (registry-cached)
+        version_id = get_version_id(db_path, model_name, version)
+        return self._deploy(conn, model_name, version, version_id, deployment_id)
+    
+    def _deploy(self, conn, model_name, version, version_id, deployment_id):
+        """Apply the strategy's traffic changes (version_id is None if unknown)"""
         raise NotImplementedError
-
-
-class DirectDeployment(DeploymentStrategy):
-    """
-    Direct deployment - immediate replacement
-    """
     
-    def deploy(self, model_name, version, deployment_id, db_path):
+    def _health_check(self, model_name, version):
+        """Perform health check"""
+        if self.health_checker is None or self.model_loader is None:
+            # Simple health check (always passes in this demo)
+            logger.info("Health check passed: %s v%s", model_name, version)
+            return True
+        
+        try:
+            model = self.model_loader.load_model(model_name, version)
+        except Exception as e:
+            logger.warning("Health check could not load model: %s", e)
+            return False
+        
+        return self.health_checker.check_availability(model)
+    
+    def _wait_until_healthy(self, model_name, version):
         """
-        Deploy directly (immediate replacement)
+        Poll health with exponential backoff until healthy or timed out
+        
+        Each probe is bounded by the time left, so the whole wait never
+        exceeds health_timeout even if a probe hangs.
         
-        Args:
-            model_name: Model name
-            version: Version to deploy
-            deployment_id: Deployment ID
-            db_path: Database path
-            
         Returns:
-            True if successful
+            True as soon as the version is healthy, False on timeout
         """
-        logger.info(f"Direct deployment: {model_name} v{version}")
+        deadline = time.monotonic() + self.health_timeout
+        backoff = 0.01
         
-        # Set traffic to 100%
-        self._set_traffic(model_name, version, 100, db_path)
+        while not self._probe(model_name, version, deadline):
+            if time.monotonic() + backoff > deadline:
+                logger.error("Health check timed out: %s v%s", model_name, version)
+                return False
+            
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 0.5)
         
-        logger.info(f"Direct deployment completed: {model_name} v{version}")
         return True
     
-    def _set_traffic(self, model_name, version, percentage, db_path):
-        """Set traffic percentage for version"""
-        conn = get_connection(db_path)
-        cursor = conn.cursor()
-        
-        # Get version ID
-        cursor.execute('''
-            SELECT v.id FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
-        
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
+    def _probe(self, model_name, version, deadline):
+        """Run one health check, giving up (unhealthy) at the deadline"""
+        if self.health_checker is None or self.model_loader is None:
+            return self._health_check(model_name, version)
+        
+        future = self._probe_executor.submit(self._health_check, model_name, version)
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            logger.warning("Health probe did not finish in time: %s v%s", model_name, version)
+            return False
+    
+    def _write_traffic(self, conn, version_id, percentage):
+        """Set traffic percentage in its own transaction, or the caller's if one is open"""
+        if conn.in_transaction:
+            conn.execute(self._SQL_UPSERT_TRAFFIC, (version_id, percentage))
             return
         
-        version_id = result['id']
+        with conn:
+            conn.execute(self._SQL_UPSERT_TRAFFIC, (version_id, percentage))
+    
+    def _set_traffic(self, conn, model_name, version, version_id, percentage):
+        """Set traffic percentage and log the change"""
+        self._write_traffic(conn, version_id, percentage)
+        logger.info("Traffic set: %s v%s -> %d%%", model_name, version, percentage)
+
+
+class DirectDeployment(DeploymentStrategy):
+    """
+    Direct deployment - immediate replacement
+    """
+    
+    waits_for_health = False
+    
+    def _deploy(self, conn, model_name, version, version_id, deployment_id):
+        """Deploy directly (immediate replacement)"""
+        logger.info("Direct deployment: %s v%s", model_name, version)
         
-        # Update or insert traffic
-        cursor.execute('''
-            INSERT OR REPLACE INTO traffic (version_id, percentage)
-            VALUES (?, ?)
-        ''', (version_id, percentage))
+        # Set traffic to 100%
+        if version_id:
+            self._set_traffic(conn, model_name, version, version_id, 100)
         
-        conn.commit()
-        conn.close()
+        logger.info("Direct deployment completed: %s v%s", model_name, version)
+        return True
 
 
 class BlueGreenDeployment(DeploymentStrategy):
@@ -89,71 +159,29 @@ class BlueGreenDeployment(DeploymentStrategy):
     Blue-Green deployment - zero downtime switch
     """
     
-    def deploy(self, model_name, version, deployment_id, db_path):
-        """
-        Deploy with blue-green strategy
+    def _deploy(self, conn, model_name, version, version_id, deployment_id):
+        """Deploy with blue-green strategy"""
+        logger.info("Blue-Green deployment: %s v%s", model_name, version)
         
-        Args:
-            model_name: Model name
-            version: Version to deploy
-            deployment_id: Deployment ID
-            db_path: Database path
-            
-        Returns:
-            True if successful
-        """
-        logger.info(f"Blue-Green deployment: {model_name} v{version}")
+        if not version_id:
+            logger.error("Version not found: %s v%s", model_name, version)
+            return False
         
         # Phase 1: Deploy to green environment (0% traffic)
         logger.info("Phase 1: Deploying to green environment")
-        self._set_traffic(model_name, version, 0, db_path)
-        time.sleep(1)  # Simulate deployment time
+        self._set_traffic(conn, model_name, version, version_id, 0)
         
-        # Phase 2: Health check
+        # Phase 2: Wait for green to report healthy
         logger.info("Phase 2: Running health checks")
-        if not self._health_check(model_name, version):
+        if not self._wait_until_healthy(model_name, version):
             logger.error("Health check failed")
             return False
         
         # Phase 3: Switch traffic (100% to new version)
         logger.info("Phase 3: Switching traffic to green")
-        self._set_traffic(model_name, version, 100, db_path)
-        
-        logger.info(f"Blue-Green deployment completed: {model_name} v{version}")
-        return True
-    
-    def _set_traffic(self, model_name, version, percentage, db_path):
-        """Set traffic percentage"""
-        conn = get_connection(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.id FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
-        
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
-            return
-        
-        version_id = result['id']
+        self._set_traffic(conn, model_name, version, version_id, 100)
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO traffic (version_id, percentage)
-            VALUES (?, ?)
-        ''', (version_id, percentage))
-        
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Traffic set: {model_name} v{version} -> {percentage}%")
-    
-    def _health_check(self, model_name, version):
-        """Perform health check"""
-        # Simple health check (always passes in this demo)
-        logger.info(f"Health check passed: {model_name} v{version}")
+        logger.info("Blue-Green deployment completed: %s v%s", model_name, version)
         return True
 
 
@@ -162,75 +190,31 @@ class CanaryDeployment(DeploymentStrategy):
     Canary deployment - gradual rollout
     """
     
-    def deploy(self, model_name, version, deployment_id, db_path):
-        """
-        Deploy with canary strategy
+    def _deploy(self, conn, model_name, version, version_id, deployment_id):
+        """Deploy with canary strategy"""
+        logger.info("Canary deployment: %s v%s", model_name, version)
         
-        Args:
-            model_name: Model name
-            version: Version to deploy
-            deployment_id: Deployment ID
-            db_path: Database path
-            
-        Returns:
-            True if successful
-        """
-        logger.info(f"Canary deployment: {model_name} v{version}")
+        if not version_id:
+            logger.error("Version not found: %s v%s", model_name, version)
+            return False
         
         # Gradual rollout: 10% -> 50% -> 100%
         stages = [10, 50, 100]
         
         for stage_percentage in stages:
-            logger.info(f"Canary stage: {stage_percentage}% traffic")
+            logger.info("Canary stage: %d%% traffic", stage_percentage)
             
             # Set traffic percentage
-            self._set_traffic(model_name, version, stage_percentage, db_path)
+            self._set_traffic(conn, model_name, version, version_id, stage_percentage)
             
-            # Monitor for issues
-            time.sleep(1)  # Simulate monitoring time
-            
-            # Check health
-            if not self._health_check(model_name, version):
-                logger.error(f"Health check failed at {stage_percentage}%")
+            # Monitor for issues until healthy or timed out
+            if not self._wait_until_healthy(model_name, version):
+                logger.error("Health check failed at %d%%", stage_percentage)
                 # Rollback
-                self._set_traffic(model_name, version, 0, db_path)
+                self._set_traffic(conn, model_name, version, version_id, 0)
                 return False
             
-            logger.info(f"Stage {stage_percentage}% successful")
-        
-        logger.info(f"Canary deployment completed: {model_name} v{version}")
-        return True
-    
-    def _set_traffic(self, model_name, version, percentage, db_path):
-        """Set traffic percentage"""
-        conn = get_connection(db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.id FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
-        
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
-            return
-        
-        version_id = result['id']
+            logger.info("Stage %d%% successful", stage_percentage)
         
-        cursor.execute('''
-            INSERT OR REPLACE INTO traffic (version_id, percentage)
-            VALUES (?, ?)
-        ''', (version_id, percentage))
-        
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Traffic set: {model_name} v{version} -> {percentage}%")
-    
-    def _health_check(self, model_name, version):
-        """Perform health check"""
-        # Simple health check (always passes in this demo)
-        logger.info(f"Health check passed: {model_name} v{version}")
+        logger.info("Canary deployment completed: %s v%s", model_name, version)
         return True
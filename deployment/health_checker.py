@@ -5,6 +5,7 @@ Check model health and availability
 
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
@@ -38,14 +39,14 @@ class HealthChecker:
             elapsed = time.time() - start_time
             
             if elapsed > timeout:
-                logger.warning(f"Health check timeout: {elapsed:.2f}s")
+                logger.warning("Health check timeout: %.2fs", elapsed)
                 return False
             
-            logger.info(f"Health check passed: {elapsed:.2f}s")
+            logger.info("Health check passed: %.2fs", elapsed)
             return True
             
         except Exception as e:
-            logger.error(f"Health check failed: {e}")
+            logger.error("Health check failed: %s", e)
             return False
     
     def check_response_time(self, model, threshold=2.0):
@@ -64,14 +65,14 @@ class HealthChecker:
             latency = result.get('latency', 0)
             
             if latency > threshold:
-                logger.warning(f"Response time too high: {latency:.2f}s")
+                logger.warning("Response time too high: %.2fs", latency)
                 return False
             
-            logger.info(f"Response time OK: {latency:.2f}s")
+            logger.info("Response time OK: %.2fs", latency)
             return True
             
         except Exception as e:
-            logger.error(f"Response time check failed: {e}")
+            logger.error("Response time check failed: %s", e)
             return False
     
     def check_error_rate(self, model, num_requests=5, max_errors=1):
@@ -86,24 +87,29 @@ class HealthChecker:
         Returns:
             True if error rate is acceptable
         """
-        errors = 0
-        
-        for i in range(num_requests):
-            try:
-                model.predict(f"test {i}", max_tokens=10)
-            except Exception as e:
-                errors += 1
-                logger.warning(f"Request {i} failed: {e}")
+        # Probes are independent network calls, so run them concurrently
+        with ThreadPoolExecutor(max_workers=num_requests) as executor:
+            failures = executor.map(lambda i: self._probe(model, i), range(num_requests))
+            errors = sum(failures)
         
         error_rate = (errors / num_requests) * 100
         
         if errors > max_errors:
-            logger.warning(f"Error rate too high: {error_rate:.1f}%")
+            logger.warning("Error rate too high: %.1f%%", error_rate)
             return False
         
-        logger.info(f"Error rate OK: {error_rate:.1f}%")
+        logger.info("Error rate OK: %.1f%%", error_rate)
         return True
     
+    def _probe(self, model, i):
+        """Send one test request, returning 1 on failure and 0 on success"""
+        try:
+            model.predict(f"test {i}", max_tokens=10)
+            return 0
+        except Exception as e:
+            logger.warning("Request %s failed: %s", i, e)
+            return 1
+    
     def comprehensive_check(self, model):
         """
         Run comprehensive health check
@@ -114,12 +120,18 @@ class HealthChecker:
         Returns:
             Dictionary with check results
         """
-        results = {
-            'available': self.check_availability(model),
-            'response_time_ok': self.check_response_time(model),
-            'error_rate_ok': self.check_error_rate(model),
-            'overall_healthy': False
-        }
+        # Subchecks are independent, so run them concurrently
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            available = executor.submit(self.check_availability, model)
+            response_time_ok = executor.submit(self.check_response_time, model)
+            error_rate_ok = executor.submit(self.check_error_rate, model)
+            
+            results = {
+                'available': available.result(),
+                'response_time_ok': response_time_ok.result(),
+                'error_rate_ok': error_rate_ok.result(),
+                'overall_healthy': False
+            }
         
         # Overall health is true if all checks pass
         results['overall_healthy'] = all([
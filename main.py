@@ -5,21 +5,20 @@ Shows examples of all model registry features
 
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
-from storage.database import init_database
-from models.gemini_model import GeminiModel
-from registry.model_registry import ModelRegistry
-from registry.version_manager import VersionManager
-from registry.metadata_store import MetadataStore
-from deployment.deployment_manager import DeploymentManager
-from rollback.rollback_manager import RollbackManager
-from rollback.snapshot_manager import SnapshotManager
-from tracking.performance_tracker import PerformanceTracker
+from storage.database import init_database, get_connection, close_pooled_connections
+
+# Component modules are imported inside each demo so skipped demos
+# (e.g. performance tracking without an API key) never load google.genai
 
 # Load environment variables
 load_dotenv()
 
+# Demo database lives in memory, shared by every connection in the process
+DEMO_DB = 'file:demo?mode=memory&cache=shared'
+
 
 def print_section(title):
     """Print section header"""
@@ -32,8 +31,10 @@ def demo_model_registration():
     """Demonstrate model registration"""
     print_section("1. Model Registration")
     
+    from registry.model_registry import ModelRegistry
+    
     try:
-        db_path = 'demo.db'
+        db_path = DEMO_DB
         registry = ModelRegistry(db_path)
         
         # Register model
@@ -43,14 +44,11 @@ def demo_model_registration():
         
         # Register versions
         print("\nRegistering versions:")
-        v1_id = registry.register_version('gemini', '1.0.0', 'stable')
-        print(f"   v1.0.0 registered (ID: {v1_id})")
+        new_versions = [('1.0.0', 'stable'), ('1.1.0', 'stable'), ('2.0.0', 'beta')]
+        version_ids = registry.register_versions_bulk('gemini', new_versions)
         
-        v2_id = registry.register_version('gemini', '1.1.0', 'stable')
-        print(f"   v1.1.0 registered (ID: {v2_id})")
-        
-        v3_id = registry.register_version('gemini', '2.0.0', 'beta')
-        print(f"   v2.0.0 registered (ID: {v3_id})")
+        for (version, _), version_id in zip(new_versions, version_ids):
+            print(f"   v{version} registered (ID: {version_id})")
         
         # List models
         models = registry.list_models()
@@ -70,6 +68,8 @@ def demo_version_management():
     """Demonstrate version management"""
     print_section("2. Version Management")
     
+    from registry.version_manager import VersionManager
+    
     try:
         version_manager = VersionManager()
         
@@ -104,8 +104,10 @@ def demo_deployment():
     """Demonstrate direct deployment"""
     print_section("3. Direct Deployment")
     
+    from deployment.deployment_manager import DeploymentManager
+    
     try:
-        db_path = 'demo.db'
+        db_path = DEMO_DB
         deployment_manager = DeploymentManager(db_path)
         
         print("\nDeploying gemini v1.0.0 with direct strategy...")
@@ -129,8 +131,10 @@ def demo_blue_green_deployment():
     """Demonstrate blue-green deployment"""
     print_section("4. Blue-Green Deployment")
     
+    from deployment.deployment_manager import DeploymentManager
+    
     try:
-        db_path = 'demo.db'
+        db_path = DEMO_DB
         deployment_manager = DeploymentManager(db_path)
         
         print("\nDeploying gemini v1.1.0 with blue-green strategy...")
@@ -151,8 +155,10 @@ def demo_canary_deployment():
     """Demonstrate canary deployment"""
     print_section("5. Canary Deployment")
     
+    from deployment.deployment_manager import DeploymentManager
+    
     try:
-        db_path = 'demo.db'
+        db_path = DEMO_DB
         deployment_manager = DeploymentManager(db_path)
         
         print("\nDeploying gemini v2.0.0 with canary strategy...")
@@ -174,8 +180,10 @@ def demo_rollback():
     """Demonstrate rollback mechanism"""
     print_section("6. Rollback Mechanism")
     
+    from rollback.rollback_manager import RollbackManager
+    
     try:
-        db_path = 'demo.db'
+        db_path = DEMO_DB
         rollback_manager = RollbackManager(db_path)
         
         print("\nSimulating performance issue with v2.0.0...")
@@ -211,38 +219,37 @@ def demo_performance_tracking():
         print("Set GEMINI_API_KEY in .env to run this demo")
         return
     
+    from models.model_loader import ModelLoader
+    from tracking.performance_tracker import PerformanceTracker
+    
     try:
-        db_path = 'demo.db'
+        db_path = DEMO_DB
         tracker = PerformanceTracker(db_path)
         
         # Simulate predictions for different versions
         print("\nSimulating predictions for version comparison...")
         
-        # Create models
-        model_v1 = GeminiModel(version="1.0.0")
-        model_v2 = GeminiModel(version="1.1.0")
-        
-        # Track predictions for v1.0.0
-        print("\n   Testing v1.0.0...")
-        for i in range(3):
-            result = model_v1.predict("Test prompt", max_tokens=20)
-            tracker.track_prediction(
-                'gemini',
-                '1.0.0',
-                result['latency'],
-                result['tokens']
-            )
-        
-        # Track predictions for v1.1.0
-        print("   Testing v1.1.0...")
-        for i in range(3):
-            result = model_v2.predict("Test prompt", max_tokens=20)
-            tracker.track_prediction(
-                'gemini',
-                '1.1.0',
-                result['latency'],
-                result['tokens']
-            )
+        # Load models (instances and API client are shared)
+        model_loader = ModelLoader()
+        model_v1 = model_loader.load_model('gemini', '1.0.0')
+        model_v2 = model_loader.load_model('gemini', '1.1.0')
+        
+        # Run all predictions concurrently (each one waits on the network)
+        print("\n   Testing v1.0.0 and v1.1.0...")
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            futures = [
+                (version, executor.submit(model.predict, "Test prompt", max_tokens=20))
+                for version, model in (('1.0.0', model_v1), ('1.1.0', model_v2))
+                for _ in range(3)
+            ]
+            
+            # Collect results and record them in a single transaction
+            predictions = []
+            for version, future in futures:
+                result = future.result()
+                predictions.append(('gemini', version, result['latency'], result['tokens']))
+        
+        tracker.track_predictions_bulk(predictions)
         
         # Get metrics
         print("\n   Performance Metrics:")
@@ -284,10 +291,10 @@ def main():
         print("Create a .env file with your API key to run all demos.")
     
     try:
-        # Clean up old database
-        db_path = 'demo.db'
-        if os.path.exists(db_path):
-            os.remove(db_path)
+        # An in-memory database exists only while a connection is open,
+        # so hold one for the whole demonstration
+        db_path = DEMO_DB
+        keep_alive = get_connection(db_path)
         
         init_database(db_path)
         
@@ -317,9 +324,9 @@ def main():
         print("  python tests.py")
         print()
         
-        # Cleanup
-        if os.path.exists(db_path):
-            os.remove(db_path)
+        # Cleanup (the in-memory database is dropped with its last connection)
+        close_pooled_connections()
+        keep_alive.close()
         
     except KeyboardInterrupt:
         print("\n\nDemonstration interrupted by user")
@@ -5,7 +5,9 @@ Google Gemini LLM integration with version support
 
 import os
 import logging
+import threading
 import time
+from functools import lru_cache
 from google import genai
 from google.genai import types
 from models.base_model import BaseModel
@@ -13,11 +15,24 @@ from models.base_model import BaseModel
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=64)
+def _generation_config(temperature, max_tokens):
+    """Build generation config once per (temperature, max_tokens)"""
+    return types.GenerateContentConfig(
+        temperature=temperature,
+        max_output_tokens=max_tokens
+    )
+
+
 class GeminiModel(BaseModel):
     """
     Google Gemini model implementation with versioning
     """
     
+    # API clients shared by all instances, keyed by API key
+    _clients = {}
+    _clients_lock = threading.Lock()
+    
     def __init__(self, version="1.0.0", model_name="gemini-2.0-flash", api_key=None):
         """
         Initialize Gemini model
@@ -37,11 +52,21 @@ class GeminiModel(BaseModel):
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY not found in environment")
         
-        self.client = genai.Client(api_key=self.api_key)
+        self.client = self._get_client(self.api_key)
         self.model_name = model_name
         
         logger.info(f"Gemini model initialized: {model_name} v{version}")
     
+    @classmethod
+    def _get_client(cls, api_key):
+        """Get the shared API client for a key, creating it on first use"""
+        with cls._clients_lock:
+            client = cls._clients.get(api_key)
+            if client is None:
+                client = genai.Client(api_key=api_key)
+                cls._clients[api_key] = client
+            return client
+    
     def predict(self, input_data, temperature=1.0, max_tokens=1000, **kwargs):
         """
         Make prediction using Gemini
@@ -64,14 +89,11 @@ class GeminiModel(BaseModel):
             contents = [
                 types.Content(
                     role="user",
-                    parts=[types.Part.from_text(text=input_data)]
+                    parts=[types.Part(text=input_data)]
                 )
             ]
             
-            generate_content_config = types.GenerateContentConfig(
-                temperature=temperature,
-                max_output_tokens=max_tokens
-            )
+            generate_content_config = _generation_config(temperature, max_tokens)
             
             response = self.client.models.generate_content(
                 model=self.model_name,
@@ -82,8 +104,10 @@ class GeminiModel(BaseModel):
             latency = time.time() - start_time
             response_text = response.text
             
-            # Simple token counting
-            tokens = len(input_data.split()) + len(response_text.split())
+            # Use the API's token count; fall back to a word count estimate
+            tokens = getattr(response.usage_metadata, 'total_token_count', None)
+            if not isinstance(tokens, int):
+                tokens = len(input_data.split()) + len(response_text.split())
             
             logger.info(f"Prediction completed: {tokens} tokens, {latency:.2f}s")
             
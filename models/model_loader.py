@@ -4,6 +4,8 @@ Dynamically load models by name and version
 """
 
 import logging
+import threading
+from collections import OrderedDict
 from models.gemini_model import GeminiModel
 
 logger = logging.getLogger(__name__)
@@ -14,9 +16,20 @@ class ModelLoader:
     Load models dynamically by name and version
     """
     
-    def __init__(self):
-        """Initialize model loader"""
-        self.loaded_models = {}
+    def __init__(self, max_models=32):
+        """
+        Initialize model loader
+        
+        Loaded instances are shared across requests and threads; the Gemini
+        client is safe for concurrent use. The least recently used instance is
+        evicted once more than max_models are loaded.
+        
+        Args:
+            max_models: Maximum number of cached model instances
+        """
+        self.max_models = max_models
+        self.loaded_models = OrderedDict()
+        self._lock = threading.Lock()
         logger.info("Model loader initialized")
     
     def load_model(self, model_name, version, config=None):
@@ -33,19 +46,26 @@ class ModelLoader:
         """
         cache_key = f"{model_name}:{version}"
         
-        # Check if already loaded
-        if cache_key in self.loaded_models:
-            logger.info(f"Using cached model: {cache_key}")
-            return self.loaded_models[cache_key]
-        
-        # Load model based on name
-        if model_name == "gemini":
-            model = GeminiModel(version=version)
-        else:
-            raise ValueError(f"Unknown model: {model_name}")
+        with self._lock:
+            # Check if already loaded
+            model = self.loaded_models.get(cache_key)
+            if model is not None:
+                self.loaded_models.move_to_end(cache_key)
+                logger.debug("Using cached model: %s", cache_key)
+                return model
+            
+            # Load model based on name
+            if model_name == "gemini":
+                model = GeminiModel(version=version)
+            else:
+                raise ValueError(f"Unknown model: {model_name}")
+            
+            # Cache the model, evicting the least recently used
+            self.loaded_models[cache_key] = model
+            if len(self.loaded_models) > self.max_models:
+                evicted, _ = self.loaded_models.popitem(last=False)
+                logger.info(f"Evicted model: {evicted}")
         
-        # Cache the model
-        self.loaded_models[cache_key] = model
         logger.info(f"Loaded model: {cache_key}")
         
         return model
@@ -60,9 +80,26 @@ class ModelLoader:
         """
         cache_key = f"{model_name}:{version}"
         
-        if cache_key in self.loaded_models:
-            del self.loaded_models[cache_key]
-            logger.info(f"Unloaded model: {cache_key}")
+        with self._lock:
+            if self.loaded_models.pop(cache_key, None) is not None:
+                logger.info(f"Unloaded model: {cache_key}")
+    
+    def invalidate(self, model_name, keep=None):
+        """
+        Unload every cached version of a model
+        
+        Args:
+            model_name: Model name
+            keep: Optional version to leave loaded (e.g. the one now serving)
+        """
+        prefix = f"{model_name}:"
+        kept = f"{model_name}:{keep}"
+        
+        with self._lock:
+            for cache_key in [key for key in self.loaded_models if key.startswith(prefix) and key != kept]:
+                del self.loaded_models[cache_key]
+        
+        logger.info(f"Invalidated cached models: {model_name}")
     
     def list_loaded_models(self):
         """
@@ -71,9 +108,11 @@ class ModelLoader:
         Returns:
             List of loaded model keys
         """
-        return list(self.loaded_models.keys())
+        with self._lock:
+            return list(self.loaded_models.keys())
     
     def clear_cache(self):
         """Clear all loaded models from cache"""
-        self.loaded_models.clear()
+        with self._lock:
+            self.loaded_models.clear()
         logger.info("Model cache cleared")
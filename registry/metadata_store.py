@@ -4,8 +4,8 @@ Store and retrieve model metadata
 """
 
 import logging
-import json
-from storage.database import get_connection
+import orjson
+from storage.database import get_pooled_connection
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +15,94 @@ class MetadataStore:
     Store model metadata
     """
     
+    _SQL_STORE_METADATA = '''
+        UPDATE versions
+        SET metadata = ?
+        WHERE id IN (
+            SELECT v.id FROM versions v
+            JOIN models m ON v.model_id = m.id
+            WHERE m.name = ? AND v.version = ?
+        )
+    '''
+    
+    # Shallow merge (dict.update semantics): keep keys not being updated, then
+    # append the updates; container and boolean values are re-marked as JSON
+    _SQL_UPDATE_METADATA = '''
+        UPDATE versions
+        SET metadata = (
+            SELECT json_group_object(key, CASE type
+                WHEN 'true' THEN json('true')
+                WHEN 'false' THEN json('false')
+                WHEN 'object' THEN json(value)
+                WHEN 'array' THEN json(value)
+                ELSE value
+            END)
+            FROM (
+                SELECT key, value, type FROM json_each(COALESCE(versions.metadata, '{}'))
+                WHERE key NOT IN (SELECT key FROM json_each(?1))
+                UNION ALL
+                SELECT key, value, type FROM json_each(?1)
+            )
+        )
+        WHERE id IN (
+            SELECT v.id FROM versions v
+            JOIN models m ON v.model_id = m.id
+            WHERE m.name = ?2 AND v.version = ?3
+        )
+        RETURNING metadata
+    '''
+    
+    _SQL_GET_METADATA = '''
+        SELECT v.metadata FROM versions v
+        JOIN models m ON v.model_id = m.id
+        WHERE m.name = ? AND v.version = ?
+    '''
+    
+    _SQL_ADD_TAG = '''
+        UPDATE versions
+        SET metadata = json_set(
+            COALESCE(metadata, '{}'),
+            '$.tags',
+            json_insert(COALESCE(json_extract(metadata, '$.tags'), '[]'), '$[#]', ?)
+        )
+        WHERE id IN (
+            SELECT v.id FROM versions v
+            JOIN models m ON v.model_id = m.id
+            WHERE m.name = ? AND v.version = ?
+        )
+        AND NOT EXISTS (
+            SELECT 1 FROM json_each(versions.metadata, '$.tags') WHERE value = ?
+        )
+        RETURNING metadata
+    '''
+    
+    _SQL_REMOVE_TAG = '''
+        UPDATE versions
+        SET metadata = json_set(metadata, '$.tags', (
+            SELECT json_group_array(value)
+            FROM json_each(versions.metadata, '$.tags')
+            WHERE value != ?
+        ))
+        WHERE id IN (
+            SELECT v.id FROM versions v
+            JOIN models m ON v.model_id = m.id
+            WHERE m.name = ? AND v.version = ?
+        )
+        AND EXISTS (
+            SELECT 1 FROM json_each(versions.metadata, '$.tags') WHERE value = ?
+        )
+        RETURNING metadata
+    '''
+    
+    _SQL_VERSIONS_BY_TAG = '''
+        SELECT v.version FROM versions v
+        JOIN models m ON v.model_id = m.id
+        WHERE m.name = ?
+        AND EXISTS (
+            SELECT 1 FROM json_each(v.metadata, '$.tags') WHERE value = ?
+        )
+    '''
+    
     def __init__(self, db_path='model_registry.db'):
         """
         Initialize metadata store
@@ -33,26 +121,19 @@ class MetadataStore:
             model_name: Model name
             version: Version string
             metadata: Metadata dictionary
+            
+        Returns:
+            The stored metadata dictionary
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        metadata_json = json.dumps(metadata)
-        
-        cursor.execute('''
-            UPDATE versions
-            SET metadata = ?
-            WHERE id IN (
-                SELECT v.id FROM versions v
-                JOIN models m ON v.model_id = m.id
-                WHERE m.name = ? AND v.version = ?
-            )
-        ''', (metadata_json, model_name, version))
+        conn = get_pooled_connection(self.db_path)
         
-        conn.commit()
-        conn.close()
+        metadata_json = orjson.dumps(metadata, option=orjson.OPT_NON_STR_KEYS).decode()
+        
+        with conn:
+            conn.execute(self._SQL_STORE_METADATA, (metadata_json, model_name, version))
         
         logger.info(f"Metadata stored: {model_name} v{version}")
+        return metadata
     
     def get_metadata(self, model_name, version):
         """
@@ -65,20 +146,14 @@ class MetadataStore:
         Returns:
             Metadata dictionary or None
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
-        cursor.execute('''
-            SELECT v.metadata FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
+        cursor.execute(self._SQL_GET_METADATA, (model_name, version))
         
         result = cursor.fetchone()
-        conn.close()
         
         if result and result['metadata']:
-            return json.loads(result['metadata'])
+            return orjson.loads(result['metadata'])
         return None
     
     def update_metadata(self, model_name, version, updates):
@@ -89,17 +164,16 @@ class MetadataStore:
             model_name: Model name
             version: Version string
             updates: Dictionary of fields to update
+            
+        Returns:
+            Updated metadata dictionary, or None if the version was not found
         """
-        # Get current metadata
-        current = self.get_metadata(model_name, version) or {}
-        
-        # Merge updates
-        current.update(updates)
-        
-        # Store updated metadata
-        self.store_metadata(model_name, version, current)
+        # Merge inside SQLite in one atomic statement
+        updates_json = orjson.dumps(updates, option=orjson.OPT_NON_STR_KEYS).decode()
+        metadata = self._write(self._SQL_UPDATE_METADATA, (updates_json, model_name, version))
         
         logger.info(f"Metadata updated: {model_name} v{version}")
+        return metadata
     
     def add_tag(self, model_name, version, tag):
         """
@@ -109,15 +183,16 @@ class MetadataStore:
             model_name: Model name
             version: Version string
             tag: Tag to add
+            
+        Returns:
+            Updated metadata dictionary, or None if nothing changed
         """
-        metadata = self.get_metadata(model_name, version) or {}
+        # Append in SQLite's JSON1 functions; no-op when the tag is present
+        metadata = self._write(self._SQL_ADD_TAG, (tag, model_name, version, tag))
         
-        tags = metadata.get('tags', [])
-        if tag not in tags:
-            tags.append(tag)
-            metadata['tags'] = tags
-            self.store_metadata(model_name, version, metadata)
+        if metadata is not None:
             logger.info(f"Tag added: {model_name} v{version} -> {tag}")
+        return metadata
     
     def remove_tag(self, model_name, version, tag):
         """
@@ -127,15 +202,16 @@ class MetadataStore:
             model_name: Model name
             version: Version string
             tag: Tag to remove
+            
+        Returns:
+            Updated metadata dictionary, or None if nothing changed
         """
-        metadata = self.get_metadata(model_name, version) or {}
+        # Rebuild the tag array without the tag; no-op when it is absent
+        metadata = self._write(self._SQL_REMOVE_TAG, (tag, model_name, version, tag))
         
-        tags = metadata.get('tags', [])
-        if tag in tags:
-            tags.remove(tag)
-            metadata['tags'] = tags
-            self.store_metadata(model_name, version, metadata)
+        if metadata is not None:
             logger.info(f"Tag removed: {model_name} v{version} -> {tag}")
+        return metadata
     
     def get_versions_by_tag(self, model_name, tag):
         """
@@ -148,23 +224,17 @@ class MetadataStore:
         Returns:
             List of version strings
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
-        cursor.execute('''
-            SELECT v.version, v.metadata FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ?
-        ''', (model_name,))
+        cursor.execute(self._SQL_VERSIONS_BY_TAG, (model_name, tag))
         
-        results = cursor.fetchall()
-        conn.close()
+        return [row['version'] for row in cursor.fetchall()]
+    
+    def _write(self, sql, params):
+        """Run an UPDATE ... RETURNING metadata and decode the written value"""
+        conn = get_pooled_connection(self.db_path)
         
-        versions = []
-        for row in results:
-            if row['metadata']:
-                metadata = json.loads(row['metadata'])
-                if tag in metadata.get('tags', []):
-                    versions.append(row['version'])
+        with conn:
+            result = conn.execute(sql, params).fetchone()
         
-        return versions
+        return orjson.loads(result['metadata']) if result else None
@@ -4,17 +4,87 @@ Central registry for managing AI models
 """
 
 import logging
-import json
-from storage.database import get_connection
+from functools import lru_cache
+import orjson
+from storage.database import get_pooled_connection
 
 logger = logging.getLogger(__name__)
 
+# Registry reads are cached per database revision. Triggers bump the
+# revision on every models/versions write from any process, so stale entries
+# are never looked up again and age out of the LRU
+_SQL_GET_REVISION = 'SELECT revision FROM registry_revision WHERE id = 1'
+
+
+def registry_revision(db_path):
+    """
+    Get the current registry revision of a database
+    
+    Args:
+        db_path: Path to database file
+        
+    Returns:
+        Revision number (changes after any models/versions write)
+    """
+    return get_pooled_connection(db_path).execute(_SQL_GET_REVISION).fetchone()[0]
+
+
+@lru_cache(maxsize=1024)
+def _cached_rows(db_path, revision, sql, params):
+    """Run a registry read once per revision; sqlite3.Row objects are immutable"""
+    return tuple(get_pooled_connection(db_path).execute(sql, params).fetchall())
+
+
+_SQL_GET_VERSION_ID = '''
+    SELECT v.id FROM versions v
+    JOIN models m ON v.model_id = m.id
+    WHERE m.name = ? AND v.version = ?
+'''
+
+
+def get_version_id(db_path, model_name, version):
+    """
+    Resolve a version ID, cached until the registry revision changes
+    
+    Misses are cached too; registering the version bumps the revision, so
+    it is seen on the next lookup.
+    
+    Args:
+        db_path: Path to database file
+        model_name: Model name
+        version: Version string
+        
+    Returns:
+        Version ID or None
+    """
+    results = _cached_rows(db_path, registry_revision(db_path), _SQL_GET_VERSION_ID, (model_name, version))
+    return results[0]['id'] if results else None
+
 
 class ModelRegistry:
     """
     Central registry for AI models
     """
     
+    _SQL_GET_MODEL = 'SELECT id, name, description, created_at FROM models WHERE name = ?'
+    
+    _SQL_LIST_MODELS = 'SELECT id, name, description, created_at FROM models ORDER BY name'
+    
+    _SQL_GET_VERSION = '''
+        SELECT v.id, v.model_id, v.version, v.status, v.metadata, v.created_at
+        FROM versions v
+        JOIN models m ON v.model_id = m.id
+        WHERE m.name = ? AND v.version = ?
+    '''
+    
+    _SQL_LIST_VERSIONS = '''
+        SELECT v.id, v.model_id, v.version, v.status, v.metadata, v.created_at
+        FROM versions v
+        JOIN models m ON v.model_id = m.id
+        WHERE m.name = ?
+        ORDER BY v.created_at DESC
+    '''
+    
     def __init__(self, db_path='model_registry.db'):
         """
         Initialize model registry
@@ -36,29 +106,19 @@ class ModelRegistry:
         Returns:
             Model ID
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        conn = get_pooled_connection(self.db_path)
         
-        try:
-            cursor.execute('''
+        # The no-op update on conflict makes RETURNING yield the existing ID
+        with conn:
+            model_id = conn.execute('''
                 INSERT INTO models (name, description)
                 VALUES (?, ?)
-            ''', (name, description))
-            
-            model_id = cursor.lastrowid
-            conn.commit()
-            logger.info(f"Model registered: {name} (ID: {model_id})")
-            return model_id
-            
-        except sqlite3.IntegrityError:
-            # Model already exists
-            cursor.execute('SELECT id FROM models WHERE name = ?', (name,))
-            model_id = cursor.fetchone()['id']
-            logger.info(f"Model already exists: {name} (ID: {model_id})")
-            return model_id
-            
-        finally:
-            conn.close()
+                ON CONFLICT(name) DO UPDATE SET description = models.description
+                RETURNING id
+            ''', (name, description)).fetchone()['id']
+        
+        logger.info(f"Model registered: {name} (ID: {model_id})")
+        return model_id
     
     def register_version(self, model_name, version, status='active', metadata=None):
         """
@@ -73,39 +133,82 @@ class ModelRegistry:
         Returns:
             Version ID
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        conn = get_pooled_connection(self.db_path)
+        
+        # Convert metadata to JSON
+        metadata_json = orjson.dumps(metadata, option=orjson.OPT_NON_STR_KEYS).decode() if metadata else None
         
-        # Get model ID
-        cursor.execute('SELECT id FROM models WHERE name = ?', (model_name,))
-        result = cursor.fetchone()
+        try:
+            # Resolve the model and insert in one statement (one write lock)
+            with conn:
+                result = conn.execute('''
+                    INSERT INTO versions (model_id, version, status, metadata)
+                    SELECT id, ?, ?, ? FROM models WHERE name = ?
+                    RETURNING id
+                ''', (version, status, metadata_json, model_name)).fetchone()
+        except Exception as e:
+            logger.error(f"Error registering version: {e}")
+            raise
         
         if not result:
-            conn.close()
             raise ValueError(f"Model not found: {model_name}")
         
-        model_id = result['id']
+        version_id = result['id']
+        logger.info(f"Version registered: {model_name} v{version} (ID: {version_id})")
+        return version_id
+    
+    def register_versions_bulk(self, model_name, versions):
+        """
+        Register several versions of a model in one transaction
         
-        # Convert metadata to JSON
-        metadata_json = json.dumps(metadata) if metadata else None
+        Args:
+            model_name: Model name
+            versions: List of (version, status) or (version, status, metadata) tuples
+            
+        Returns:
+            List of version IDs, in input order
+        """
+        conn = get_pooled_connection(self.db_path)
+        cursor = conn.cursor()
         
         try:
-            cursor.execute('''
-                INSERT INTO versions (model_id, version, status, metadata)
-                VALUES (?, ?, ?, ?)
-            ''', (model_id, version, status, metadata_json))
+            # Get model ID once for all rows
+            cursor.execute('SELECT id FROM models WHERE name = ?', (model_name,))
+            result = cursor.fetchone()
+            
+            if not result:
+                raise ValueError(f"Model not found: {model_name}")
+            
+            model_id = result['id']
+            
+            rows = []
+            for entry in versions:
+                version, status = entry[0], entry[1]
+                metadata = entry[2] if len(entry) > 2 else None
+                metadata_json = orjson.dumps(metadata, option=orjson.OPT_NON_STR_KEYS).decode() if metadata else None
+                rows.append((model_id, version, status, metadata_json))
+            
+            with conn:
+                cursor.executemany('''
+                    INSERT INTO versions (model_id, version, status, metadata)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
             
-            version_id = cursor.lastrowid
-            conn.commit()
-            logger.info(f"Version registered: {model_name} v{version} (ID: {version_id})")
-            return version_id
+            # Resolve IDs for the inserted versions
+            names = [row[1] for row in rows]
+            placeholders = ','.join('?' * len(names))
+            cursor.execute(f'''
+                SELECT id, version FROM versions
+                WHERE model_id = ? AND version IN ({placeholders})
+            ''', (model_id, *names))
+            
+            ids = {row['version']: row['id'] for row in cursor.fetchall()}
+            logger.info(f"Versions registered: {model_name} ({len(rows)} versions)")
+            return [ids[name] for name in names]
             
         except Exception as e:
-            logger.error(f"Error registering version: {e}")
+            logger.error(f"Error registering versions: {e}")
             raise
-            
-        finally:
-            conn.close()
     
     def get_model(self, name):
         """
@@ -117,15 +220,10 @@ class ModelRegistry:
         Returns:
             Model dictionary or None
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        results = _cached_rows(self.db_path, registry_revision(self.db_path), self._SQL_GET_MODEL, (name,))
         
-        cursor.execute('SELECT * FROM models WHERE name = ?', (name,))
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            return dict(result)
+        if results:
+            return dict(results[0])
         return None
     
     def get_version(self, model_name, version):
@@ -139,23 +237,14 @@ class ModelRegistry:
         Returns:
             Version dictionary or None
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.* FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
-        
-        result = cursor.fetchone()
-        conn.close()
+        results = _cached_rows(self.db_path, registry_revision(self.db_path), self._SQL_GET_VERSION,
+                               (model_name, version))
         
-        if result:
-            version_dict = dict(result)
+        if results:
+            version_dict = dict(results[0])
             # Parse metadata JSON
             if version_dict.get('metadata'):
-                version_dict['metadata'] = json.loads(version_dict['metadata'])
+                version_dict['metadata'] = orjson.loads(version_dict['metadata'])
             return version_dict
         return None
     
@@ -164,16 +253,9 @@ class ModelRegistry:
         List all registered models
         
         Returns:
-            List of model dictionaries
+            List of model rows (sqlite3.Row)
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM models ORDER BY name')
-        results = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in results]
+        return list(_cached_rows(self.db_path, registry_revision(self.db_path), self._SQL_LIST_MODELS, ()))
     
     def list_versions(self, model_name):
         """
@@ -185,24 +267,17 @@ class ModelRegistry:
         Returns:
             List of version dictionaries
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
-        cursor.execute('''
-            SELECT v.* FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ?
-            ORDER BY v.created_at DESC
-        ''', (model_name,))
+        cursor.execute(self._SQL_LIST_VERSIONS, (model_name,))
         
         results = cursor.fetchall()
-        conn.close()
         
         versions = []
         for row in results:
             version_dict = dict(row)
             if version_dict.get('metadata'):
-                version_dict['metadata'] = json.loads(version_dict['metadata'])
+                version_dict['metadata'] = orjson.loads(version_dict['metadata'])
             versions.append(version_dict)
         
         return versions
@@ -216,23 +291,18 @@ class ModelRegistry:
             version: Version string
             status: New status
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        conn = get_pooled_connection(self.db_path)
         
-        cursor.execute('''
-            UPDATE versions
-            SET status = ?
-            WHERE id IN (
-                SELECT v.id FROM versions v
-                JOIN models m ON v.model_id = m.id
-                WHERE m.name = ? AND v.version = ?
-            )
-        ''', (status, model_name, version))
-        
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute('''
+                UPDATE versions
+                SET status = ?
+                WHERE id IN (
+                    SELECT v.id FROM versions v
+                    JOIN models m ON v.model_id = m.id
+                    WHERE m.name = ? AND v.version = ?
+                )
+            ''', (status, model_name, version))
         
         logger.info(f"Version status updated: {model_name} v{version} -> {status}")
 
-
-import sqlite3
@@ -4,11 +4,34 @@ Semantic versioning and version comparison
 """
 
 import logging
+from functools import lru_cache
 from packaging import version
+from packaging.version import InvalidVersion
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=4096)
+def _parse(version_string):
+    """Parse a version string once; Version objects are immutable"""
+    return version.parse(version_string)
+
+
+@lru_cache(maxsize=512)
+def _increment(version_string, part):
+    """Compute an incremented version string once per (version, part)"""
+    v = _parse(version_string)
+    
+    if part == 'major':
+        return f"{v.major + 1}.0.0"
+    elif part == 'minor':
+        return f"{v.major}.{v.minor + 1}.0"
+    elif part == 'patch':
+        return f"{v.major}.{v.minor}.{v.micro + 1}"
+    
+    raise ValueError(f"Invalid part: {part}")
+
+
 class VersionManager:
     """
     Manage semantic versioning for models
@@ -29,8 +52,8 @@ class VersionManager:
             Version object
         """
         try:
-            return version.parse(version_string)
-        except Exception as e:
+            return _parse(version_string)
+        except (InvalidVersion, TypeError):
             logger.error(f"Invalid version string: {version_string}")
             raise ValueError(f"Invalid version: {version_string}")
     
@@ -50,12 +73,7 @@ class VersionManager:
         v1 = self.parse_version(version1)
         v2 = self.parse_version(version2)
         
-        if v1 < v2:
-            return -1
-        elif v1 > v2:
-            return 1
-        else:
-            return 0
+        return (v1 > v2) - (v1 < v2)
     
     def is_newer(self, version1, version2):
         """
@@ -100,10 +118,7 @@ class VersionManager:
         if not versions:
             return None
         
-        parsed_versions = [(v, self.parse_version(v)) for v in versions]
-        latest = max(parsed_versions, key=lambda x: x[1])
-        
-        return latest[0]
+        return max(versions, key=self.parse_version)
     
     def increment_version(self, version_string, part='patch'):
         """
@@ -116,16 +131,8 @@ class VersionManager:
         Returns:
             New version string
         """
-        v = self.parse_version(version_string)
-        
-        if part == 'major':
-            new_version = f"{v.major + 1}.0.0"
-        elif part == 'minor':
-            new_version = f"{v.major}.{v.minor + 1}.0"
-        elif part == 'patch':
-            new_version = f"{v.major}.{v.minor}.{v.micro + 1}"
-        else:
-            raise ValueError(f"Invalid part: {part}")
+        self.parse_version(version_string)
+        new_version = _increment(version_string, part)
         
         logger.info(f"Version incremented: {version_string} -> {new_version}")
         return new_version
@@ -141,7 +148,7 @@ class VersionManager:
             True if valid
         """
         try:
-            self.parse_version(version_string)
+            _parse(version_string)
             return True
-        except:
+        except (InvalidVersion, TypeError):
             return False
@@ -4,7 +4,9 @@ Manage model rollbacks
 """
 
 import logging
-from storage.database import get_connection
+import threading
+from collections import deque
+from storage.database import get_pooled_connection
 from rollback.snapshot_manager import SnapshotManager
 
 logger = logging.getLogger(__name__)
@@ -15,17 +17,59 @@ class RollbackManager:
     Manage model rollbacks
     """
     
-    def __init__(self, db_path='model_registry.db'):
+    # Walks idx_deployments_status_time newest-first and stops at the limit
+    _SQL_RECENT_DEPLOYMENTS = '''
+        SELECT d.id, d.strategy, d.deployed_at, v.version
+        FROM deployments d
+        JOIN versions v ON d.version_id = v.id
+        WHERE v.model_id = (SELECT id FROM models WHERE name = ?)
+        AND d.status = 'completed'
+        ORDER BY d.deployed_at DESC, d.id DESC
+        LIMIT ?
+    '''
+    
+    def __init__(self, db_path='model_registry.db', error_window=100, snapshot_manager=None):
         """
         Initialize rollback manager
         
         Args:
             db_path: Path to database file
+            error_window: Number of recent predictions used for the error rate
+            snapshot_manager: Optional SnapshotManager to share (one is created if omitted)
         """
         self.db_path = db_path
-        self.snapshot_manager = SnapshotManager(db_path)
+        self.snapshot_manager = snapshot_manager or SnapshotManager(db_path)
+        self.error_window = error_window
+        self._outcomes = {}
+        self._error_counts = {}
+        self._outcomes_lock = threading.Lock()
         logger.info("Rollback manager initialized")
     
+    def record_outcome(self, model_name, version, success=True):
+        """
+        Record a prediction outcome for the rolling error rate
+        
+        Args:
+            model_name: Model name
+            version: Model version
+            success: Whether prediction was successful
+        """
+        key = (model_name, version)
+        failed = 0 if success else 1
+        
+        with self._outcomes_lock:
+            outcomes = self._outcomes.get(key)
+            if outcomes is None:
+                outcomes = self._outcomes[key] = deque(maxlen=self.error_window)
+                self._error_counts[key] = 0
+            
+            # Keep the error count in step with the outcome falling off the window
+            if len(outcomes) == self.error_window:
+                self._error_counts[key] -= outcomes[0]
+            
+            outcomes.append(failed)
+            self._error_counts[key] += failed
+    
     def rollback_to_previous(self, model_name):
         """
         Rollback to previous version
@@ -48,11 +92,8 @@ class RollbackManager:
         
         logger.info(f"Rolling back {model_name}: v{current['version']} -> v{previous['version']}")
         
-        # Restore previous version traffic
-        self._set_traffic(model_name, previous['version'], 100)
-        
-        # Set current version traffic to 0
-        self._set_traffic(model_name, current['version'], 0)
+        # Route all traffic back to the previous version
+        self._apply_traffic_switch(model_name, previous['version'])
         
         logger.info(f"Rollback completed: {model_name} v{previous['version']}")
         return previous['version']
@@ -75,11 +116,8 @@ class RollbackManager:
         
         logger.info(f"Rolling back {model_name} to v{version}")
         
-        # Set target version traffic to 100%
-        self._set_traffic(model_name, version, 100)
-        
-        # Set all other versions to 0%
-        self._clear_other_traffic(model_name, version)
+        # Set target version traffic to 100% and all others to 0%
+        self._apply_traffic_switch(model_name, version)
         
         logger.info(f"Rollback completed: {model_name} v{version}")
         return True
@@ -141,23 +179,11 @@ class RollbackManager:
     
     def _get_recent_deployments(self, model_name, limit=2):
         """Get recent deployments"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT d.*, v.version
-            FROM deployments d
-            JOIN versions v ON d.version_id = v.id
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND d.status = 'completed'
-            ORDER BY d.deployed_at DESC
-            LIMIT ?
-        ''', (model_name, limit))
+        cursor = get_pooled_connection(self.db_path).cursor()
         
-        results = cursor.fetchall()
-        conn.close()
+        cursor.execute(self._SQL_RECENT_DEPLOYMENTS, (model_name, limit))
         
-        return [dict(row) for row in results]
+        return cursor.fetchall()
     
     def _get_current_deployment(self, model_name):
         """Get current deployment"""
@@ -166,67 +192,59 @@ class RollbackManager:
     
     def _version_exists(self, model_name, version):
         """Check if version exists"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
         cursor.execute('''
-            SELECT COUNT(*) as count
+            SELECT 1
             FROM versions v
             JOIN models m ON v.model_id = m.id
             WHERE m.name = ? AND v.version = ?
+            LIMIT 1
         ''', (model_name, version))
         
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result['count'] > 0
+        return cursor.fetchone() is not None
     
-    def _set_traffic(self, model_name, version, percentage):
-        """Set traffic percentage"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.id FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
-        
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
-            return
-        
-        version_id = result['id']
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO traffic (version_id, percentage)
-            VALUES (?, ?)
-        ''', (version_id, percentage))
-        
-        conn.commit()
-        conn.close()
-    
-    def _clear_other_traffic(self, model_name, keep_version):
-        """Clear traffic for all versions except one"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE traffic
-            SET percentage = 0
-            WHERE version_id IN (
-                SELECT v.id FROM versions v
+    def _apply_traffic_switch(self, model_name, keep_version):
+        """Route all of a model's traffic to one version in a single transaction"""
+        conn = get_pooled_connection(self.db_path)
+        
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Give the target version a traffic row if it never had one
+            conn.execute('''
+                INSERT OR IGNORE INTO traffic (version_id, percentage)
+                SELECT v.id, 100 FROM versions v
                 JOIN models m ON v.model_id = m.id
-                WHERE m.name = ? AND v.version != ?
-            )
-        ''', (model_name, keep_version))
-        
-        conn.commit()
-        conn.close()
+                WHERE m.name = ? AND v.version = ?
+            ''', (model_name, keep_version))
+            
+            # Resolve the model's versions once; the UPDATE then seeks
+            # traffic rows by version_id on the unique index
+            conn.execute('''
+                WITH model_versions(vid, version) AS (
+                    SELECT id, version FROM versions
+                    WHERE model_id = (SELECT id FROM models WHERE name = ?1)
+                )
+                UPDATE traffic
+                SET percentage = CASE
+                        WHEN version_id = (SELECT vid FROM model_versions WHERE version = ?2) THEN 100
+                        ELSE 0
+                    END,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE version_id IN (SELECT vid FROM model_versions)
+            ''', (model_name, keep_version))
+            
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
     
     def _get_error_rate(self, model_name, version):
-        """Get error rate for version (simplified)"""
-        # In production, this would query real metrics
-        # For demo, return a low error rate
-        return 0.01
+        """Get error rate over the recent prediction window"""
+        key = (model_name, version)
+        
+        with self._outcomes_lock:
+            outcomes = self._outcomes.get(key)
+            if not outcomes:
+                return 0.0
+            return self._error_counts[key] / len(outcomes)
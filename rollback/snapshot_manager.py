@@ -4,8 +4,8 @@ Create and restore deployment snapshots
 """
 
 import logging
-import json
-from storage.database import get_connection
+import orjson
+from storage.database import get_pooled_connection
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +35,23 @@ class SnapshotManager:
         Returns:
             Snapshot ID
         """
+        snapshot_data = self.capture_snapshot(deployment_id)
+        
+        if snapshot_data is None:
+            return None
+        
+        return self.store_snapshot(snapshot_data)
+    
+    def capture_snapshot(self, deployment_id):
+        """
+        Read the current state of a deployment without storing it
+        
+        Args:
+            deployment_id: Deployment ID
+            
+        Returns:
+            Snapshot data dictionary or None
+        """
         # Get deployment details
         deployment = self._get_deployment(deployment_id)
         
@@ -45,8 +62,7 @@ class SnapshotManager:
         # Get traffic configuration
         traffic = self._get_traffic_config(deployment['version_id'])
         
-        # Create snapshot data
-        snapshot_data = {
+        return {
             'deployment_id': deployment_id,
             'version_id': deployment['version_id'],
             'version': deployment['version'],
@@ -54,8 +70,18 @@ class SnapshotManager:
             'strategy': deployment['strategy'],
             'traffic': traffic
         }
+    
+    def store_snapshot(self, snapshot_data):
+        """
+        Store captured snapshot data
         
-        # Store snapshot
+        Args:
+            snapshot_data: Dictionary from capture_snapshot()
+            
+        Returns:
+            Snapshot ID
+        """
+        deployment_id = snapshot_data['deployment_id']
         snapshot_id = self._store_snapshot(deployment_id, snapshot_data)
         
         logger.info(f"Snapshot created: {snapshot_id} for deployment {deployment_id}")
@@ -72,14 +98,12 @@ class SnapshotManager:
             True if successful
         """
         # Get snapshot data
-        snapshot = self._get_snapshot(snapshot_id)
+        snapshot_data = self.get_snapshot_data(snapshot_id)
         
-        if not snapshot:
+        if snapshot_data is None:
             logger.error(f"Snapshot not found: {snapshot_id}")
             return False
         
-        snapshot_data = json.loads(snapshot['snapshot_data'])
-        
         logger.info(f"Restoring snapshot: {snapshot_id}")
         
         # Restore traffic configuration
@@ -99,34 +123,50 @@ class SnapshotManager:
         Returns:
             List of snapshot dictionaries
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
         if deployment_id:
             cursor.execute('''
-                SELECT * FROM snapshots
+                SELECT id, deployment_id, snapshot_data, created_at FROM snapshots
                 WHERE deployment_id = ?
                 ORDER BY created_at DESC
                 LIMIT ?
             ''', (deployment_id, limit))
         else:
             cursor.execute('''
-                SELECT * FROM snapshots
+                SELECT id, deployment_id, snapshot_data, created_at FROM snapshots
                 ORDER BY created_at DESC
                 LIMIT ?
             ''', (limit,))
         
         results = cursor.fetchall()
-        conn.close()
         
         snapshots = []
         for row in results:
             snapshot = dict(row)
-            snapshot['snapshot_data'] = json.loads(snapshot['snapshot_data'])
+            snapshot['snapshot_data'] = orjson.loads(snapshot['snapshot_data'])
             snapshots.append(snapshot)
         
         return snapshots
     
+    def get_snapshot_data(self, snapshot_id):
+        """
+        Get the decoded payload of a snapshot
+        
+        Args:
+            snapshot_id: Snapshot ID
+            
+        Returns:
+            Snapshot data dictionary or None
+        """
+        cursor = get_pooled_connection(self.db_path).cursor()
+        
+        cursor.execute('SELECT snapshot_data FROM snapshots WHERE id = ?', (snapshot_id,))
+        
+        result = cursor.fetchone()
+        
+        return orjson.loads(result['snapshot_data']) if result else None
+    
     def delete_snapshot(self, snapshot_id):
         """
         Delete snapshot
@@ -134,23 +174,19 @@ class SnapshotManager:
         Args:
             snapshot_id: Snapshot ID
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        conn = get_pooled_connection(self.db_path)
         
-        cursor.execute('DELETE FROM snapshots WHERE id = ?', (snapshot_id,))
-        
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute('DELETE FROM snapshots WHERE id = ?', (snapshot_id,))
         
         logger.info(f"Snapshot deleted: {snapshot_id}")
     
     def _get_deployment(self, deployment_id):
         """Get deployment details"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
         cursor.execute('''
-            SELECT d.*, v.version, m.name as model_name
+            SELECT d.id, d.version_id, d.strategy, v.version, m.name as model_name
             FROM deployments d
             JOIN versions v ON d.version_id = v.id
             JOIN models m ON v.model_id = m.id
@@ -158,14 +194,12 @@ class SnapshotManager:
         ''', (deployment_id,))
         
         result = cursor.fetchone()
-        conn.close()
         
         return dict(result) if result else None
     
     def _get_traffic_config(self, version_id):
         """Get traffic configuration"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
         cursor.execute('''
             SELECT percentage FROM traffic
@@ -173,49 +207,31 @@ class SnapshotManager:
         ''', (version_id,))
         
         result = cursor.fetchone()
-        conn.close()
         
         return result['percentage'] if result else 0
     
     def _store_snapshot(self, deployment_id, snapshot_data):
         """Store snapshot in database"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        snapshot_json = json.dumps(snapshot_data)
+        conn = get_pooled_connection(self.db_path)
         
-        cursor.execute('''
-            INSERT INTO snapshots (deployment_id, snapshot_data)
-            VALUES (?, ?)
-        ''', (deployment_id, snapshot_json))
+        snapshot_json = orjson.dumps(snapshot_data).decode()
         
-        snapshot_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with conn:
+            cursor = conn.execute('''
+                INSERT INTO snapshots (deployment_id, snapshot_data)
+                VALUES (?, ?)
+            ''', (deployment_id, snapshot_json))
         
-        return snapshot_id
-    
-    def _get_snapshot(self, snapshot_id):
-        """Get snapshot from database"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT * FROM snapshots WHERE id = ?', (snapshot_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        return dict(result) if result else None
+        return cursor.lastrowid
     
     def _restore_traffic(self, version_id, percentage):
         """Restore traffic configuration"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO traffic (version_id, percentage)
-            VALUES (?, ?)
-        ''', (version_id, percentage))
-        
-        conn.commit()
-        conn.close()
+        conn = get_pooled_connection(self.db_path)
+        
+        with conn:
+            conn.execute('''
+                INSERT INTO traffic (version_id, percentage)
+                VALUES (?, ?)
+                ON CONFLICT(version_id) DO UPDATE
+                SET percentage = excluded.percentage, updated_at = CURRENT_TIMESTAMP
+            ''', (version_id, percentage))
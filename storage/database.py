@@ -3,11 +3,48 @@ Database Module
 Initialize and manage SQLite database for model registry
 """
 
+import atexit
 import sqlite3
 import logging
+import threading
+import weakref
 
 logger = logging.getLogger(__name__)
 
+# Per-thread pool of reusable connections, keyed by database path
+_pool = threading.local()
+_pool_lock = threading.Lock()
+_pool_generation = 0
+_pooled_connections = weakref.WeakSet()
+
+
+class PooledConnection(sqlite3.Connection):
+    """SQLite connection owned by the per-thread connection pool"""
+
+
+# Compiled statements kept per connection (sqlite3 defaults to 128)
+STATEMENT_CACHE_SIZE = 256
+
+# Per-connection tuning; journal_mode=WAL is persistent and set in init_database
+_CONNECTION_PRAGMAS = '''
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-65536;
+    PRAGMA busy_timeout=5000;
+'''
+
+
+def _is_uri(db_path):
+    """Whether a database path is a SQLite URI (e.g. shared in-memory databases)"""
+    return db_path.startswith('file:')
+
+
+def _configure_connection(conn):
+    """Apply row factory and performance pragmas to a new connection"""
+    conn.row_factory = sqlite3.Row
+    conn.executescript(_CONNECTION_PRAGMAS)
+
 
 def init_database(db_path='model_registry.db'):
     """
@@ -16,9 +53,13 @@ def init_database(db_path='model_registry.db'):
     Args:
         db_path: Path to database file
     """
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(db_path, uri=_is_uri(db_path))
     cursor = conn.cursor()
     
+    # Write-ahead logging lets readers proceed alongside a writer; the
+    # setting is stored in the database file
+    cursor.execute('PRAGMA journal_mode=WAL')
+    
     # Models table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS models (
@@ -104,6 +145,121 @@ def init_database(db_path='model_registry.db'):
         )
     ''')
     
+    # Registry revision, bumped by triggers on every models/versions change
+    # (in any process), so cached registry reads can check they are current
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS registry_revision (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            revision INTEGER NOT NULL
+        )
+    ''')
+    
+    cursor.execute('INSERT OR IGNORE INTO registry_revision (id, revision) VALUES (1, 0)')
+    
+    for table in ('models', 'versions'):
+        for event in ('INSERT', 'UPDATE', 'DELETE'):
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_revision
+                AFTER {event} ON {table}
+                BEGIN
+                    UPDATE registry_revision SET revision = revision + 1 WHERE id = 1;
+                END
+            ''')
+    
+    # Indexes for hot lookups (models.name and versions(model_id, version)
+    # are already indexed by their UNIQUE constraints)
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_deployments_status_time
+        ON deployments (status, deployed_at)
+    ''')
+    
+    # One traffic row per version; drop duplicates left by older releases
+    # before enforcing it, keeping the most recent row
+    cursor.execute('''
+        DELETE FROM traffic
+        WHERE id NOT IN (SELECT MAX(id) FROM traffic GROUP BY version_id)
+    ''')
+    
+    cursor.execute('DROP INDEX IF EXISTS idx_traffic_version')
+    
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_traffic_version_unique
+        ON traffic (version_id)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_deployments_version_time
+        ON deployments (version_id, deployed_at)
+    ''')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_snapshots_deployment_time
+        ON snapshots (deployment_id, created_at)
+    ''')
+    
+    # Recent-metric reads filter by name too; the (version_id, metric_name,
+    # timestamp) index serves them as a bounded range read with no sort
+    cursor.execute('DROP INDEX IF EXISTS idx_metrics_version_time')
+    
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_metrics_version_name_time
+        ON metrics (version_id, metric_name, timestamp)
+    ''')
+    
+    # Covers the per-version aggregates so they never touch the table rows
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_metrics_version_name_value
+        ON metrics (version_id, metric_name, metric_value)
+    ''')
+    
+    # Running count/sum/min/max per (version, metric), kept by a trigger so
+    # aggregate reads are a few summary rows instead of a scan over every
+    # sample; it replaces the success-only version_counters table
+    cursor.execute('DROP TRIGGER IF EXISTS trg_metrics_success_count')
+    cursor.execute('DROP TABLE IF EXISTS version_counters')
+    
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS metric_summary (
+            version_id INTEGER NOT NULL,
+            metric_name TEXT NOT NULL,
+            samples INTEGER NOT NULL,
+            value_sum REAL NOT NULL,
+            value_min REAL NOT NULL,
+            value_max REAL NOT NULL,
+            PRIMARY KEY (version_id, metric_name),
+            FOREIGN KEY (version_id) REFERENCES versions(id)
+        ) WITHOUT ROWID
+    ''')
+    
+    summary_trigger_exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_metrics_summary'"
+    ).fetchone()
+    
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_metrics_summary
+        AFTER INSERT ON metrics
+        BEGIN
+            INSERT INTO metric_summary (version_id, metric_name, samples, value_sum, value_min, value_max)
+            VALUES (NEW.version_id, NEW.metric_name, 1, NEW.metric_value, NEW.metric_value, NEW.metric_value)
+            ON CONFLICT(version_id, metric_name) DO UPDATE SET
+                samples = samples + 1,
+                value_sum = value_sum + excluded.value_sum,
+                value_min = MIN(value_min, excluded.value_min),
+                value_max = MAX(value_max, excluded.value_max);
+        END
+    ''')
+    
+    # Samples written before the trigger existed are summarized once
+    if not summary_trigger_exists:
+        cursor.execute('''
+            INSERT OR REPLACE INTO metric_summary
+                (version_id, metric_name, samples, value_sum, value_min, value_max)
+            SELECT version_id, metric_name, COUNT(*), SUM(metric_value),
+                   MIN(metric_value), MAX(metric_value)
+            FROM metrics
+            GROUP BY version_id, metric_name
+        ''')
+    
     conn.commit()
     conn.close()
     
@@ -120,6 +276,65 @@ def get_connection(db_path='model_registry.db'):
     Returns:
         SQLite connection
     """
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
+    conn = sqlite3.connect(db_path, uri=_is_uri(db_path), cached_statements=STATEMENT_CACHE_SIZE)
+    _configure_connection(conn)
     return conn
+
+
+def get_pooled_connection(db_path='model_registry.db'):
+    """
+    Get a reusable database connection for the current thread
+    
+    The connection is opened once per thread and database path and kept
+    open across calls. Callers must not close it; use
+    close_pooled_connections() on shutdown.
+    
+    Args:
+        db_path: Path to database file
+        
+    Returns:
+        SQLite connection
+    """
+    if getattr(_pool, 'generation', None) != _pool_generation:
+        _pool.connections = {}
+        _pool.generation = _pool_generation
+    
+    conn = _pool.connections.get(db_path)
+    
+    if conn is None:
+        conn = sqlite3.connect(db_path, factory=PooledConnection, check_same_thread=False,
+                               uri=_is_uri(db_path), cached_statements=STATEMENT_CACHE_SIZE)
+        _configure_connection(conn)
+        
+        _pool.connections[db_path] = conn
+        with _pool_lock:
+            _pooled_connections.add(conn)
+        
+        logger.debug(f"Pooled connection opened: {db_path}")
+    
+    return conn
+
+
+def close_pooled_connections():
+    """Close all pooled connections in every thread"""
+    global _pool_generation
+    
+    with _pool_lock:
+        connections = list(_pooled_connections)
+        _pooled_connections.clear()
+        _pool_generation += 1
+    
+    for conn in connections:
+        # Let SQLite refresh planner statistics gathered by this connection
+        # (usually a no-op); a busy database must not block shutdown
+        try:
+            conn.execute('PRAGMA optimize')
+        except sqlite3.Error as e:
+            logger.debug(f"PRAGMA optimize skipped: {e}")
+        conn.close()
+    
+    logger.debug(f"Closed {len(connections)} pooled connection(s)")
+
+
+# Pooled connections are never closed by callers; release them on interpreter exit
+atexit.register(close_pooled_connections)
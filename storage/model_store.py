@@ -3,9 +3,12 @@ Model Store
 Store and retrieve model artifacts
 """
 
+import copy
 import os
-import json
+import shutil
 import logging
+import threading
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -24,12 +27,14 @@ class ModelStore:
         """
         self.store_path = store_path
         
+        # Parsed configs keyed by (model, version), validated by file mtime/size
+        self._config_cache = {}
+        self._config_cache_lock = threading.Lock()
+        
         # Create store directory if it doesn't exist
-        if not os.path.exists(store_path):
-            os.makedirs(store_path)
-            logger.info(f"Created model store: {store_path}")
+        os.makedirs(store_path, exist_ok=True)
     
-    def save_model_config(self, model_name, version, config):
+    def save_model_config(self, model_name, version, config, pretty=False):
         """
         Save model configuration
         
@@ -37,21 +42,25 @@ class ModelStore:
             model_name: Model name
             version: Model version
             config: Configuration dictionary
+            pretty: Indent the JSON for human reading (compact by default)
             
         Returns:
             Path to saved config
         """
         model_dir = os.path.join(self.store_path, model_name, version)
         
-        if not os.path.exists(model_dir):
-            os.makedirs(model_dir)
+        os.makedirs(model_dir, exist_ok=True)
         
         config_path = os.path.join(model_dir, 'config.json')
         
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        
+        with open(config_path, 'wb') as f:
+            f.write(orjson.dumps(config, option=option))
         
-        logger.info(f"Saved config: {config_path}")
+        self._forget_config(model_name, version)
+        
+        logger.info("Saved config: %s", config_path)
         return config_path
     
     def load_model_config(self, model_name, version):
@@ -66,16 +75,36 @@ class ModelStore:
             Configuration dictionary or None
         """
         config_path = os.path.join(self.store_path, model_name, version, 'config.json')
+        key = (model_name, version)
         
-        if not os.path.exists(config_path):
+        try:
+            st = os.stat(config_path)
+        except FileNotFoundError:
+            self._forget_config(model_name, version)
             logger.warning(f"Config not found: {config_path}")
             return None
         
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+        stamp = (st.st_mtime_ns, st.st_size)
+        
+        with self._config_cache_lock:
+            cached = self._config_cache.get(key)
         
-        logger.info(f"Loaded config: {config_path}")
-        return config
+        if cached is not None and cached[0] == stamp:
+            logger.debug("Config cache hit: %s", config_path)
+            return copy.deepcopy(cached[1])
+        
+        try:
+            with open(config_path, 'rb') as f:
+                config = orjson.loads(f.read())
+        except FileNotFoundError:
+            logger.warning(f"Config not found: {config_path}")
+            return None
+        
+        with self._config_cache_lock:
+            self._config_cache[key] = (stamp, config)
+        
+        logger.info("Loaded config: %s", config_path)
+        return copy.deepcopy(config)
     
     def delete_model_version(self, model_name, version):
         """
@@ -87,10 +116,14 @@ class ModelStore:
         """
         model_dir = os.path.join(self.store_path, model_name, version)
         
-        if os.path.exists(model_dir):
-            import shutil
+        self._forget_config(model_name, version)
+        
+        try:
             shutil.rmtree(model_dir)
-            logger.info(f"Deleted model version: {model_dir}")
+        except FileNotFoundError:
+            return
+        
+        logger.info(f"Deleted model version: {model_dir}")
     
     def list_model_versions(self, model_name):
         """
@@ -104,10 +137,16 @@ class ModelStore:
         """
         model_dir = os.path.join(self.store_path, model_name)
         
-        if not os.path.exists(model_dir):
+        # scandir reports entry types without a stat call per entry
+        try:
+            with os.scandir(model_dir) as entries:
+                versions = [entry.name for entry in entries if entry.is_dir()]
+        except FileNotFoundError:
             return []
         
-        versions = [d for d in os.listdir(model_dir) 
-                   if os.path.isdir(os.path.join(model_dir, d))]
-        
         return sorted(versions)
+    
+    def _forget_config(self, model_name, version):
+        """Drop a cached config after it is rewritten or removed"""
+        with self._config_cache_lock:
+            self._config_cache.pop((model_name, version), None)
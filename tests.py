@@ -10,19 +10,29 @@ TESTING APPROACH:
 
 import unittest
 import os
+import sqlite3
+import shutil
+import tempfile
+import time
 from unittest.mock import patch, Mock
 from dotenv import load_dotenv
 
-from storage.database import init_database
+from storage.database import init_database, get_pooled_connection, close_pooled_connections
+from models.base_model import BaseModel
 from models.gemini_model import GeminiModel
-from registry.model_registry import ModelRegistry
+from registry.model_registry import ModelRegistry, get_version_id
 from registry.version_manager import VersionManager
 from registry.metadata_store import MetadataStore
 from deployment.deployment_manager import DeploymentManager
+from deployment.deployment_strategy import CanaryDeployment
 from rollback.rollback_manager import RollbackManager
 from rollback.snapshot_manager import SnapshotManager
 from tracking.performance_tracker import PerformanceTracker
+from tracking.alerting import AlertingSystem
 from deployment.health_checker import HealthChecker
+from models.model_loader import ModelLoader
+from api.serialization import format_metrics
+from api.validation import DEPLOY, PREDICT, RequestValidationError
 
 # Load environment variables
 load_dotenv()
@@ -40,10 +50,10 @@ class ModelRegistryTestCase(unittest.TestCase):
         print("Testing: Registry, Versioning, Deployment, Rollback, Tracking")
         print("=" * 60 + "\n")
         
-        # Use test database
-        cls.db_path = 'test_registry.db'
-        if os.path.exists(cls.db_path):
-            os.remove(cls.db_path)
+        # Use a private test database so separate test processes can run
+        # side by side (the numbered tests share state, so they stay in order)
+        cls.db_dir = tempfile.mkdtemp(prefix='model_registry_test_')
+        cls.db_path = os.path.join(cls.db_dir, 'test_registry.db')
         
         init_database(cls.db_path)
         
@@ -55,8 +65,9 @@ class ModelRegistryTestCase(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         """Clean up after tests"""
-        if os.path.exists(cls.db_path):
-            os.remove(cls.db_path)
+        close_pooled_connections()
+        # Removes the WAL side files along with the database
+        shutil.rmtree(cls.db_dir, ignore_errors=True)
     
     # Test 1: Model Registration
     def test_01_model_registration(self):
@@ -109,6 +120,33 @@ class ModelRegistryTestCase(unittest.TestCase):
         self.assertIsNotNone(version)
         self.assertEqual(version['version'], '1.0.0')
         print(f"   Retrieved version: {version['version']}")
+        
+        # Register several versions in one transaction
+        registry.register_model('bulk-model')
+        bulk_ids = registry.register_versions_bulk('bulk-model', [('1.0.0', 'stable'), ('1.1.0', 'beta')])
+        self.assertEqual(len(bulk_ids), 2)
+        self.assertEqual(registry.get_version('bulk-model', '1.1.0')['id'], bulk_ids[1])
+        print(f"   Bulk registered: {len(bulk_ids)} versions")
+        
+        # Writes from another worker process (a separate connection) are
+        # seen by cached reads in this one
+        self.assertIsNone(registry.get_version('bulk-model', '2.0.0'))
+        with sqlite3.connect(self.db_path) as other:
+            other.execute(
+                "UPDATE versions SET status = 'deprecated' WHERE id = ?", (bulk_ids[0],)
+            )
+            other.execute(
+                "INSERT INTO versions (model_id, version, status) "
+                "SELECT id, '2.0.0', 'beta' FROM models WHERE name = 'bulk-model'"
+            )
+        other.close()
+        self.assertEqual(registry.get_version('bulk-model', '1.0.0')['status'], 'deprecated')
+        self.assertIsNotNone(registry.get_version('bulk-model', '2.0.0'))
+        print("   Cached reads see writes from other processes")
+        
+        # Non-string metadata keys are stored as strings, as json.dumps did
+        registry.register_version('bulk-model', '3.0.0', 'beta', {'buckets': {1: 'low', 2: 'high'}})
+        self.assertEqual(registry.get_version('bulk-model', '3.0.0')['metadata'], {'buckets': {'1': 'low', '2': 'high'}})
     
     # Test 3: Version Comparison
     def test_03_version_comparison(self):
@@ -152,6 +190,15 @@ class ModelRegistryTestCase(unittest.TestCase):
         self.assertEqual(deployment['strategy'], 'direct')
         self.assertEqual(deployment['status'], 'completed')
         print(f"   Deployment status: {deployment['status']}")
+        
+        # Direct deploys run in one transaction: a failure leaves no trace
+        count = len(deployment_manager.list_deployments(limit=100))
+        with patch.object(deployment_manager.strategies['direct'], '_set_traffic', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                deployment_manager.deploy('gemini', '1.1.0', 'direct')
+        self.assertEqual(len(deployment_manager.list_deployments(limit=100)), count)
+        self.assertFalse(get_pooled_connection(self.db_path).in_transaction)
+        print("   Failed direct deploy: Rolled back")
     
     # Test 5: Blue-Green Deployment
     def test_05_blue_green_deployment(self):
@@ -160,11 +207,20 @@ class ModelRegistryTestCase(unittest.TestCase):
         
         deployment_manager = DeploymentManager(self.db_path)
         
+        # Warm the active deployment cache
+        active = deployment_manager.get_active_deployment('gemini')
+        self.assertEqual(active['version'], '1.0.0')
+        
         # Deploy with blue-green strategy
         deployment_id = deployment_manager.deploy('gemini', '1.1.0', 'blue-green')
         self.assertIsNotNone(deployment_id)
         print(f"   Blue-green deployment ID: {deployment_id}")
         
+        # Deploying invalidates the cached active deployment
+        active = deployment_manager.get_active_deployment('gemini')
+        self.assertEqual(active['version'], '1.1.0')
+        print(f"   Active version: {active['version']}")
+        
         # Verify deployment
         deployment = deployment_manager.get_deployment(deployment_id)
         self.assertEqual(deployment['strategy'], 'blue-green')
@@ -188,6 +244,39 @@ class ModelRegistryTestCase(unittest.TestCase):
         self.assertEqual(deployment['strategy'], 'canary')
         self.assertEqual(deployment['status'], 'completed')
         print("   Canary deployment: Successful")
+        
+        # Unhealthy versions are rolled back once the health wait times out
+        health_checker = Mock()
+        health_checker.check_availability.return_value = False
+        canary = CanaryDeployment(health_checker, Mock(), health_timeout=0.05)
+        self.assertFalse(canary.deploy('gemini', '2.0.0', deployment_id, self.db_path))
+        print("   Unhealthy canary: Rolled back")
+        
+        # A hung probe cannot hold the deploy past health_timeout
+        slow_checker = Mock()
+        slow_checker.check_availability.side_effect = lambda model: time.sleep(0.5) or True
+        canary = CanaryDeployment(slow_checker, Mock(), health_timeout=0.1)
+        started = time.monotonic()
+        self.assertFalse(canary.deploy('gemini', '2.0.0', deployment_id, self.db_path))
+        self.assertLess(time.monotonic() - started, 0.4)
+        print("   Hung health probe: Deploy failed within health_timeout")
+        
+        # Health waits must not hold the write lock: another connection
+        # writes (without waiting) while every stage is being checked
+        def check_while_writing(model):
+            writer = sqlite3.connect(self.db_path, timeout=0)
+            try:
+                with writer:
+                    writer.execute("UPDATE models SET description = description WHERE name = 'gemini'")
+            finally:
+                writer.close()
+            return True
+        
+        health_checker.check_availability.side_effect = check_while_writing
+        gated_manager = DeploymentManager(self.db_path, health_checker=health_checker, model_loader=Mock())
+        deployment_id = gated_manager.deploy('gemini', '2.0.0', 'canary')
+        self.assertEqual(gated_manager.get_deployment(deployment_id)['status'], 'completed')
+        print("   Health-gated canary: No write lock held while waiting")
     
     # Test 7: Rollback
     def test_07_rollback(self):
@@ -205,6 +294,35 @@ class ModelRegistryTestCase(unittest.TestCase):
         success = rollback_manager.rollback_to_version('gemini', '1.0.0')
         self.assertTrue(success)
         print("   Rollback to v1.0.0: Successful")
+        
+        # Rollback reroutes traffic rows only: predictions keep being served
+        # by the active deployment, whose cached model stays loaded
+        class ServedModel(BaseModel):
+            def predict(self, input_data, **kwargs):
+                return {'prediction': 'ok', 'latency': 0.1, 'tokens': 1}
+        
+        with patch.dict(os.environ, {'DATABASE_PATH': self.db_path}):
+            import api.app as api_app
+        
+        client = api_app.app.test_client()
+        active = api_app.deployment_manager.get_active_deployment('gemini')['version']
+        api_app.model_loader.loaded_models[f'gemini:{active}'] = ServedModel('gemini', active)
+        
+        response = client.post('/api/models/gemini/rollback', json={'version': '1.0.0'})
+        self.assertEqual(response.status_code, 200)
+        response = client.post('/api/models/gemini/predict', json={'input': 'hello'})
+        self.assertEqual(response.get_json()['version'], active)
+        self.assertIn(f'gemini:{active}', api_app.model_loader.list_loaded_models())
+        print(f"   Predictions after rollback served by: v{active}")
+        
+        # Error rate covers only the most recent predictions
+        rollback_manager = RollbackManager(self.db_path, error_window=4)
+        for success in (False, False, True, True, True, True):
+            rollback_manager.record_outcome('gemini', '1.0.0', success)
+        self.assertEqual(rollback_manager._get_error_rate('gemini', '1.0.0'), 0.0)
+        rollback_manager.record_outcome('gemini', '1.0.0', False)
+        self.assertEqual(rollback_manager._get_error_rate('gemini', '1.0.0'), 0.25)
+        print("   Rolling error rate: 25%")
     
     # Test 8: Snapshot Management
     def test_08_snapshot_management(self):
@@ -234,6 +352,13 @@ class ModelRegistryTestCase(unittest.TestCase):
             success = snapshot_manager.restore_snapshot(snapshot_id)
             self.assertTrue(success)
             print("   Snapshot restored: Successful")
+            
+            # Captured state is stored as captured, even if traffic changes first
+            snapshot_data = snapshot_manager.capture_snapshot(deployment_id)
+            snapshot_manager._restore_traffic(snapshot_data['version_id'], 0)
+            stored_id = snapshot_manager.store_snapshot(snapshot_data)
+            self.assertEqual(snapshot_manager.get_snapshot_data(stored_id), snapshot_data)
+            snapshot_manager.restore_snapshot(stored_id)
         else:
             print("   Skipped (no deployments)")
     
@@ -302,6 +427,222 @@ class ModelRegistryTestCase(unittest.TestCase):
             results = health_checker.comprehensive_check(model)
             self.assertTrue(results['overall_healthy'])
             print("   Comprehensive check: Passed (mocked)")
+    
+    # Test 11: Prediction Batching
+    def test_11_model_loader(self):
+        """Test the shared model cache (MOCKED models)"""
+        print("\n11. Testing model loader (mocked)...")
+        
+        model_loader = ModelLoader()
+        for key in ('gemini:1.0.0', 'gemini:1.1.0', 'other:1.0.0'):
+            model_loader.loaded_models[key] = Mock()
+        
+        # Cached instances are shared
+        cached = model_loader.loaded_models['gemini:1.1.0']
+        self.assertIs(model_loader.load_model('gemini', '1.1.0'), cached)
+        
+        # Deploys unload every other cached version of the model
+        model_loader.invalidate('gemini', keep='1.1.0')
+        self.assertEqual(sorted(model_loader.list_loaded_models()), ['gemini:1.1.0', 'other:1.0.0'])
+        print("   Superseded versions unloaded")
+    
+    def test_12_request_validation(self):
+        """Test request body validation"""
+        print("\n12. Testing request validation...")
+        
+        data = DEPLOY.parse(b'{"version": "1.0.0"}')
+        self.assertEqual(data, {'version': '1.0.0', 'strategy': 'direct'})
+        print(f"   Parsed with defaults: {data}")
+        
+        for body in (b'', b'{"strategy": "canary"}', b'{"version": 1}', b'not json'):
+            with self.assertRaises(RequestValidationError):
+                DEPLOY.parse(body)
+        
+        self.assertEqual(PREDICT.parse(b'{"input": "hello"}'), {'input': 'hello'})
+        for body in (b'{"input": ""}', b'{"input": 42}', b'{"input": null}'):
+            with self.assertRaises(RequestValidationError):
+                PREDICT.parse(body)
+        print("   Invalid bodies rejected: OK")
+    
+    def test_13_metadata_tags(self):
+        """Test metadata tags and merged updates"""
+        print("\n13. Testing metadata tags...")
+        
+        metadata_store = MetadataStore(self.db_path)
+        
+        metadata_store.store_metadata('gemini', '1.1.0', {'owner': 'ml-team'})
+        self.assertEqual(metadata_store.get_metadata('gemini', '1.1.0'), {'owner': 'ml-team'})
+        
+        # Tag writes are idempotent
+        metadata_store.add_tag('gemini', '1.1.0', 'production')
+        metadata_store.add_tag('gemini', '1.1.0', 'production')
+        self.assertEqual(metadata_store.get_metadata('gemini', '1.1.0')['tags'], ['production'])
+        self.assertEqual(metadata_store.get_versions_by_tag('gemini', 'production'), ['1.1.0'])
+        print("   Tag added: production")
+        
+        metadata_store.remove_tag('gemini', '1.1.0', 'production')
+        self.assertEqual(metadata_store.get_metadata('gemini', '1.1.0')['tags'], [])
+        self.assertEqual(metadata_store.get_versions_by_tag('gemini', 'production'), [])
+        print("   Tag removed: production")
+        
+        # Updates merge into existing metadata
+        metadata_store.update_metadata('gemini', '1.1.0', {'owner': 'platform', 'approved': True})
+        metadata = metadata_store.get_metadata('gemini', '1.1.0')
+        self.assertEqual(metadata, {'owner': 'platform', 'tags': [], 'approved': True})
+        print(f"   Metadata merged: {metadata}")
+        
+        # Metadata writes also invalidate cached registry reads
+        version = ModelRegistry(self.db_path).get_version('gemini', '1.1.0')
+        self.assertEqual(version['metadata'], metadata)
+        
+        # Writes from another worker process are read back
+        with sqlite3.connect(self.db_path) as other:
+            other.execute(
+                "UPDATE versions SET metadata = json_set(metadata, '$.owner', 'ops') "
+                "WHERE id = ?", (version['id'],)
+            )
+        other.close()
+        self.assertEqual(metadata_store.get_metadata('gemini', '1.1.0')['owner'], 'ops')
+        print("   Metadata reads see writes from other processes")
+    
+    # Test 14: Query Plans
+    def test_14_query_plans(self):
+        """Test hot read queries use indexes instead of table scans"""
+        print("\n14. Testing query plans...")
+        
+        conn = get_pooled_connection(self.db_path)
+        
+        hot_queries = [
+            ('get_version', ModelRegistry._SQL_GET_VERSION, ('gemini', '1.0.0'), 'sqlite_autoindex_versions_1'),
+            ('list_versions', ModelRegistry._SQL_LIST_VERSIONS, ('gemini',), 'sqlite_autoindex_versions_1'),
+            ('recent_deployments', RollbackManager._SQL_RECENT_DEPLOYMENTS, ('gemini', 2), 'idx_deployments_status_time'),
+        ]
+        
+        for name, sql, params, index in hot_queries:
+            plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+            
+            self.assertFalse([step for step in plan if step.startswith('SCAN')], f"{name}: {plan}")
+            self.assertTrue(any(index in step for step in plan), f"{name}: {plan}")
+            print(f"   {name}: uses {index}")
+    
+    # Test 15: Metric Summaries
+    def test_15_metric_summaries(self):
+        """Test running metric summaries match the stored samples"""
+        print("\n15. Testing metric summaries...")
+        
+        tracker = PerformanceTracker(self.db_path)
+        tracker.track_predictions_bulk([
+            ('gemini', '1.1.0', 0.5, 10, True),
+            ('gemini', '1.1.0', 1.5, 30, False),
+        ])
+        
+        conn = get_pooled_connection(self.db_path)
+        version_id = ModelRegistry(self.db_path).get_version('gemini', '1.1.0')['id']
+        
+        expected = conn.execute('''
+            SELECT metric_name, COUNT(*), SUM(metric_value), MIN(metric_value), MAX(metric_value)
+            FROM metrics WHERE version_id = ? GROUP BY metric_name ORDER BY metric_name
+        ''', (version_id,)).fetchall()
+        summary = conn.execute('''
+            SELECT metric_name, samples, value_sum, value_min, value_max
+            FROM metric_summary WHERE version_id = ? ORDER BY metric_name
+        ''', (version_id,)).fetchall()
+        
+        self.assertEqual([tuple(row) for row in summary], [tuple(row) for row in expected])
+        
+        metrics = tracker.get_metrics('gemini', '1.1.0')
+        self.assertEqual(metrics['min_latency'], 0.5)
+        self.assertEqual(metrics['max_latency'], 1.5)
+        self.assertEqual(metrics['success_rate'], 50.0)
+        print(f"   Summaries match {len(summary)} metric kinds")
+        
+        # Predictions tracked in a batch are written together on exit
+        with tracker.batch():
+            tracker.track_prediction('gemini', '1.1.0', 1.0, 20)
+            tracker.track_prediction('gemini', '1.1.0', 1.0, 20)
+            self.assertEqual(tracker.get_metrics('gemini', '1.1.0')['total_requests'], 2)
+        
+        metrics = tracker.get_metrics('gemini', '1.1.0')
+        self.assertEqual(metrics['total_requests'], 4)
+        print(f"   Batched predictions: {metrics['total_requests']} total requests")
+        
+        ranking = {m['version']: m for m in tracker.get_version_ranking('gemini')}
+        self.assertEqual(ranking['1.1.0'], dict(metrics, performance_score=ranking['1.1.0']['performance_score']))
+        print(f"   Ranked versions: {list(ranking)}")
+        
+        # The API rounds the exact values only when responding
+        self.assertEqual(
+            format_metrics({'avg_latency': 0.1 + 0.2, 'version1': {'success_rate': 200 / 3}, 'total_requests': 3}),
+            {'avg_latency': 0.3, 'version1': {'success_rate': 66.67}, 'total_requests': 3}
+        )
+        with patch.dict(os.environ, {'DATABASE_PATH': self.db_path}):
+            import api.app as api_app
+        response = api_app.app.test_client().get('/api/models/gemini/metrics?version=1.1.0')
+        self.assertEqual(response.get_json()['metrics'], format_metrics(metrics))
+        print("   API metrics: Rounded for display")
+        
+        # Unknown versions are cached as misses until a registration bumps
+        # the registry revision (through its trigger)
+        self.assertIsNone(get_version_id(self.db_path, 'gemini', '3.0.0'))
+        version_id = ModelRegistry(self.db_path).register_version('gemini', '3.0.0', 'beta')
+        self.assertEqual(get_version_id(self.db_path, 'gemini', '3.0.0'), version_id)
+        tracker.track_prediction('gemini', '3.0.0', 1.0, 20)
+        self.assertEqual(tracker.get_metrics('gemini', '3.0.0')['total_requests'], 1)
+        print("   Cached miss replaced after registration")
+    
+    # Test 16: Alert Checks
+    def test_16_alert_checks(self):
+        """Test batched alert checks match the single checks"""
+        print("\n16. Testing alert checks...")
+        
+        registry = ModelRegistry(self.db_path)
+        registry.register_model('alerts-model')
+        registry.register_versions_bulk('alerts-model', [('1.0', 'stable'), ('2.0', 'beta'), ('3.0', 'beta')])
+        
+        # 1.0 is fast and healthy, 2.0 is slow with 50% errors, 3.0 has no metrics
+        tracker = PerformanceTracker(self.db_path)
+        tracker.track_predictions_bulk(
+            [('alerts-model', '1.0', 0.5, 10, True)] * 5 +
+            [('alerts-model', '2.0', 3.0, 10, i % 2 == 0) for i in range(6)]
+        )
+        
+        checks = [
+            ('alerts-model', '2.0', '1.0'),
+            ('alerts-model', '1.0', None),
+            ('alerts-model', '3.0', '1.0'),
+            ('alerts-model', '9.9', '1.0')
+        ]
+        
+        alerting = AlertingSystem(self.db_path)
+        conn = get_pooled_connection(self.db_path)
+        
+        def stored_alerts():
+            """Take (and clear) the alerts stored for the test model"""
+            rows = alerting.get_alerts(model_name='alerts-model', limit=100)
+            with conn:
+                conn.execute('''
+                    DELETE FROM alerts WHERE version_id IN (
+                        SELECT v.id FROM versions v JOIN models m ON v.model_id = m.id
+                        WHERE m.name = 'alerts-model'
+                    )
+                ''')
+            return sorted((row['version'], row['alert_type'], row['message'], row['severity']) for row in rows)
+        
+        expected = {}
+        for model_name, version, previous_version in checks:
+            types = expected[(model_name, version)] = []
+            if alerting.check_latency_threshold(model_name, version):
+                types.append('latency_high')
+            if alerting.check_error_rate_threshold(model_name, version):
+                types.append('error_rate_high')
+            if previous_version and alerting.check_performance_degradation(model_name, version, previous_version):
+                types.append('performance_degradation')
+        expected_alerts = stored_alerts()
+        
+        self.assertEqual(expected[('alerts-model', '2.0')], ['latency_high', 'error_rate_high', 'performance_degradation'])
+        self.assertEqual(alerting.check_all(checks), expected)
+        self.assertEqual(stored_alerts(), expected_alerts)
+        print(f"   check_all matches single checks: {expected[('alerts-model', '2.0')]}")
 
 
 def run_tests():
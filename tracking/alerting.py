@@ -4,7 +4,8 @@ Alert on performance issues
 """
 
 import logging
-from storage.database import get_connection
+from storage.database import get_pooled_connection
+from registry.model_registry import get_version_id
 
 logger = logging.getLogger(__name__)
 
@@ -126,6 +127,81 @@ class AlertingSystem:
         
         return False
     
+    def check_all(self, checks, latency_threshold=2.0, error_threshold=0.1, degradation_threshold=0.2):
+        """
+        Run latency, error rate and degradation checks for many versions at once
+        
+        Metrics for every version involved are read in one query and all
+        triggered alerts are stored in one transaction.
+        
+        Args:
+            checks: List of (model_name, version, previous_version) tuples;
+                previous_version may be None to skip the degradation check
+            latency_threshold: Latency threshold in seconds
+            error_threshold: Error rate threshold (0.0 to 1.0)
+            degradation_threshold: Degradation threshold (0.0 to 1.0)
+            
+        Returns:
+            Dictionary of (model_name, version) -> list of triggered alert types
+        """
+        resolved = []
+        for model_name, version, previous_version in checks:
+            version_id = self._get_version_id(model_name, version)
+            previous_id = self._get_version_id(model_name, previous_version) if previous_version else None
+            resolved.append((model_name, version, previous_version, version_id, previous_id))
+        
+        version_ids = {vid for entry in resolved for vid in entry[3:] if vid}
+        stats = self._get_check_stats(version_ids)
+        
+        triggered = {}
+        alerts = []
+        
+        for model_name, version, previous_version, version_id, previous_id in resolved:
+            types = triggered.setdefault((model_name, version), [])
+            current = stats.get(version_id)
+            
+            if not current:
+                continue
+            
+            recent_latency = current['recent_latency'] or 0.0
+            if recent_latency > latency_threshold:
+                types.append('latency_high')
+                alerts.append((version_id, 'latency_high',
+                               f"Average latency {recent_latency:.2f}s exceeds threshold {latency_threshold}s",
+                               'warning'))
+            
+            if current['total'] > 0:
+                error_rate = 1.0 - (current['successes'] / current['total'])
+                if error_rate > error_threshold:
+                    types.append('error_rate_high')
+                    alerts.append((version_id, 'error_rate_high',
+                                   f"Error rate {error_rate:.2%} exceeds threshold {error_threshold:.2%}",
+                                   'critical'))
+            
+            previous = stats.get(previous_id)
+            previous_latency = previous['avg_latency'] if previous else None
+            
+            if previous_latency:
+                degradation = ((current['avg_latency'] or 0.0) - previous_latency) / previous_latency
+                if degradation > degradation_threshold:
+                    types.append('performance_degradation')
+                    alerts.append((version_id, 'performance_degradation',
+                                   f"Performance degraded by {degradation:.1%} compared to v{previous_version}",
+                                   'warning'))
+        
+        if alerts:
+            conn = get_pooled_connection(self.db_path)
+            
+            with conn:
+                conn.executemany('''
+                    INSERT INTO alerts (version_id, alert_type, message, severity)
+                    VALUES (?, ?, ?, ?)
+                ''', alerts)
+            
+            logger.warning(f"Alerts triggered: {len(alerts)}")
+        
+        return triggered
+    
     def get_alerts(self, model_name=None, version=None, severity=None, limit=10):
         """
         Get alerts
@@ -137,10 +213,9 @@ class AlertingSystem:
             limit: Number of records
             
         Returns:
-            List of alert dictionaries
+            List of alert rows (sqlite3.Row)
         """
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
         query = '''
             SELECT a.*, v.version, m.name as model_name
@@ -167,34 +242,54 @@ class AlertingSystem:
         params.append(limit)
         
         cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in results]
+        return cursor.fetchall()
     
     def _get_version_id(self, model_name, version):
-        """Get version ID"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.id FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result['id'] if result else None
+        """Get version ID (cached in the registry until the next write)"""
+        return get_version_id(self.db_path, model_name, version)
+    
+    def _get_check_stats(self, version_ids):
+        """Get alert-check aggregates for several versions in one query"""
+        if not version_ids:
+            return {}
+        
+        cursor = get_pooled_connection(self.db_path).cursor()
+        
+        # Same windows as the single checks: last 10 latencies for the latency
+        # threshold, last 100 for degradation. Each window is a LIMIT read
+        # down idx_metrics_version_name_time, so the cost does not grow with
+        # a version's history. Success counts come from the running summaries
+        values = ','.join(['(?)'] * len(version_ids))
+        cursor.execute(f'''
+            WITH ids(version_id) AS (VALUES {values})
+            SELECT 
+                i.version_id,
+                (SELECT AVG(metric_value) FROM (
+                    SELECT metric_value FROM metrics
+                    WHERE version_id = i.version_id AND metric_name = 'latency'
+                    ORDER BY timestamp DESC LIMIT 10
+                )) as recent_latency,
+                (SELECT AVG(metric_value) FROM (
+                    SELECT metric_value FROM metrics
+                    WHERE version_id = i.version_id AND metric_name = 'latency'
+                    ORDER BY timestamp DESC LIMIT 100
+                )) as avg_latency,
+                COALESCE(s.samples, 0) as total,
+                COALESCE(s.value_sum, 0) as successes
+            FROM ids i
+            LEFT JOIN metric_summary s
+                ON s.version_id = i.version_id AND s.metric_name = 'success'
+        ''', tuple(version_ids))
+        
+        # Versions with no metrics at all are left out, as before
+        return {row['version_id']: row for row in cursor if row['recent_latency'] is not None or row['total']}
     
     def _get_avg_metric(self, version_id, metric_name, limit=100):
         """Get average metric value"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
         cursor.execute('''
-            SELECT AVG(metric_value) as avg
+            SELECT COALESCE(AVG(metric_value), 0.0)
             FROM (
                 SELECT metric_value
                 FROM metrics
@@ -204,40 +299,28 @@ class AlertingSystem:
             )
         ''', (version_id, metric_name, limit))
         
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result['avg'] or 0.0
+        return cursor.fetchone()[0]
     
     def _get_error_rate(self, version_id):
         """Calculate error rate"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
         cursor.execute('''
-            SELECT 
-                COUNT(*) as total,
-                SUM(metric_value) as successes
-            FROM metrics
-            WHERE version_id = ? AND metric_name = 'success'
+            SELECT COALESCE((
+                SELECT 1.0 - value_sum / samples
+                FROM metric_summary
+                WHERE version_id = ? AND metric_name = 'success'
+            ), 0.0)
         ''', (version_id,))
         
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result['total'] > 0:
-            return 1.0 - (result['successes'] / result['total'])
-        return 0.0
+        return cursor.fetchone()[0]
     
     def _create_alert(self, version_id, alert_type, message, severity):
         """Create alert"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO alerts (version_id, alert_type, message, severity)
-            VALUES (?, ?, ?, ?)
-        ''', (version_id, alert_type, message, severity))
+        conn = get_pooled_connection(self.db_path)
         
-        conn.commit()
-        conn.close()
+        with conn:
+            conn.execute('''
+                INSERT INTO alerts (version_id, alert_type, message, severity)
+                VALUES (?, ?, ?, ?)
+            ''', (version_id, alert_type, message, severity))
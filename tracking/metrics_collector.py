@@ -4,7 +4,8 @@ Collect and aggregate metrics
 """
 
 import logging
-from storage.database import get_connection
+from storage.database import get_pooled_connection
+from registry.model_registry import get_version_id
 
 logger = logging.getLogger(__name__)
 
@@ -40,18 +41,65 @@ class MetricsCollector:
             logger.warning(f"Version not found: {model_name} v{version}")
             return
         
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        conn = get_pooled_connection(self.db_path)
         
-        cursor.execute('''
-            INSERT INTO metrics (version_id, metric_name, metric_value)
-            VALUES (?, ?, ?)
-        ''', (version_id, metric_name, metric_value))
+        with conn:
+            conn.execute('''
+                INSERT INTO metrics (version_id, metric_name, metric_value)
+                VALUES (?, ?, ?)
+            ''', (version_id, metric_name, metric_value))
+        
+        logger.debug("Metric collected: %s=%s", metric_name, metric_value)
+    
+    def collect_metrics_bulk(self, records):
+        """
+        Collect several metrics in one transaction
+        
+        Args:
+            records: List of (model_name, version, metric_name, metric_value) tuples
+            
+        Returns:
+            Number of metrics stored
+        """
+        rows = []
         
-        conn.commit()
-        conn.close()
+        for model_name, version, metric_name, metric_value in records:
+            version_id = self._get_version_id(model_name, version)
+            
+            if not version_id:
+                logger.warning(f"Version not found: {model_name} v{version}")
+                continue
+            
+            rows.append((version_id, metric_name, metric_value))
         
-        logger.debug(f"Metric collected: {metric_name}={metric_value}")
+        if rows:
+            conn = get_pooled_connection(self.db_path)
+            
+            with conn:
+                conn.executemany('''
+                    INSERT INTO metrics (version_id, metric_name, metric_value)
+                    VALUES (?, ?, ?)
+                ''', rows)
+        
+        logger.debug("Metrics collected: %d", len(rows))
+        return len(rows)
+    
+    def collect_metrics(self, model_name, version, items):
+        """
+        Collect several metrics for one model version in one transaction
+        
+        Args:
+            model_name: Model name
+            version: Model version
+            items: List of (metric_name, metric_value) tuples
+            
+        Returns:
+            Number of metrics stored
+        """
+        return self.collect_metrics_bulk(
+            (model_name, version, metric_name, metric_value)
+            for metric_name, metric_value in items
+        )
     
     def get_recent_metrics(self, model_name, version, metric_name, limit=100):
         """
@@ -64,15 +112,14 @@ class MetricsCollector:
             limit: Number of records
             
         Returns:
-            List of metric values
+            List of metric rows (sqlite3.Row)
         """
         version_id = self._get_version_id(model_name, version)
         
         if not version_id:
             return []
         
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
         cursor.execute('''
             SELECT metric_value, timestamp
@@ -82,10 +129,7 @@ class MetricsCollector:
             LIMIT ?
         ''', (version_id, metric_name, limit))
         
-        results = cursor.fetchall()
-        conn.close()
-        
-        return [dict(row) for row in results]
+        return cursor.fetchall()
     
     def get_aggregated_metrics(self, model_name, version):
         """
@@ -103,35 +147,25 @@ class MetricsCollector:
         if not version_id:
             return None
         
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
+        cursor = get_pooled_connection(self.db_path).cursor()
         
-        # Get all metric types
+        # Running summaries are kept per metric kind as samples are inserted
         cursor.execute('''
-            SELECT DISTINCT metric_name
-            FROM metrics
+            SELECT 
+                metric_name,
+                samples as count,
+                value_sum / samples as avg,
+                value_min as min,
+                value_max as max,
+                value_sum as sum
+            FROM metric_summary
             WHERE version_id = ?
         ''', (version_id,))
         
-        metric_names = [row['metric_name'] for row in cursor.fetchall()]
-        
         aggregated = {}
         
-        for metric_name in metric_names:
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as count,
-                    AVG(metric_value) as avg,
-                    MIN(metric_value) as min,
-                    MAX(metric_value) as max,
-                    SUM(metric_value) as sum
-                FROM metrics
-                WHERE version_id = ? AND metric_name = ?
-            ''', (version_id, metric_name))
-            
-            stats = cursor.fetchone()
-            
-            aggregated[metric_name] = {
+        for stats in cursor:
+            aggregated[stats['metric_name']] = {
                 'count': stats['count'],
                 'avg': round(stats['avg'] or 0, 3),
                 'min': round(stats['min'] or 0, 3),
@@ -139,22 +173,8 @@ class MetricsCollector:
                 'sum': round(stats['sum'] or 0, 3)
             }
         
-        conn.close()
-        
         return aggregated
     
     def _get_version_id(self, model_name, version):
-        """Get version ID"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.id FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result['id'] if result else None
+        """Get version ID (cached in the registry until the next write)"""
+        return get_version_id(self.db_path, model_name, version)
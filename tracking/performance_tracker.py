@@ -4,7 +4,10 @@ Track model performance metrics
 """
 
 import logging
-from storage.database import get_connection
+import threading
+from contextlib import contextmanager
+from storage.database import get_pooled_connection
+from registry.model_registry import get_version_id
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +17,37 @@ class PerformanceTracker:
     Track model performance metrics
     """
     
+    # Per-version metrics from the running summaries (one row per metric kind);
+    # summary rows always hold at least one sample, and missing kinds become 0
+    _SQL_METRIC_COLUMNS = '''
+        COALESCE(MAX(CASE WHEN s.metric_name = 'latency' THEN s.value_sum / s.samples END), 0.0) as avg_latency,
+        COALESCE(MAX(CASE WHEN s.metric_name = 'latency' THEN s.value_min END), 0.0) as min_latency,
+        COALESCE(MAX(CASE WHEN s.metric_name = 'latency' THEN s.value_max END), 0.0) as max_latency,
+        COALESCE(MAX(CASE WHEN s.metric_name = 'tokens' THEN s.value_sum / s.samples END), 0.0) as avg_tokens,
+        CAST(COALESCE(MAX(CASE WHEN s.metric_name = 'tokens' THEN s.value_sum END), 0) AS INTEGER) as total_tokens,
+        COALESCE(MAX(CASE WHEN s.metric_name = 'success' THEN s.samples END), 0) as total_requests,
+        COALESCE(MAX(CASE WHEN s.metric_name = 'success' THEN s.value_sum * 100.0 / s.samples END), 0.0) as success_rate
+    '''
+    
+    _SQL_GET_METRICS = f'''
+        SELECT {_SQL_METRIC_COLUMNS}
+        FROM metric_summary s
+        WHERE s.version_id = ? AND s.metric_name IN ('latency', 'tokens', 'success')
+    '''
+    
+    # Score = success ratio / average latency (lower latency + higher success rate = better)
+    _SQL_VERSION_RANKING = f'''
+        SELECT v.version, {_SQL_METRIC_COLUMNS}
+        FROM versions v
+        JOIN models m ON v.model_id = m.id
+        JOIN metric_summary s ON s.version_id = v.id
+        WHERE m.name = ? AND s.metric_name IN ('latency', 'tokens', 'success')
+        GROUP BY v.id
+        HAVING total_requests > 0 AND avg_latency > 0
+        ORDER BY success_rate / avg_latency DESC
+        LIMIT ?
+    '''
+    
     def __init__(self, db_path='model_registry.db'):
         """
         Initialize performance tracker
@@ -22,8 +56,29 @@ class PerformanceTracker:
             db_path: Path to database file
         """
         self.db_path = db_path
+        self._local = threading.local()
         logger.info("Performance tracker initialized")
     
+    @contextmanager
+    def batch(self):
+        """
+        Group track_prediction calls in this thread into one transaction
+        
+        Predictions tracked inside the block are written together when it
+        exits (also when it exits with an exception). Nested blocks join
+        the outermost one.
+        """
+        if getattr(self._local, 'pending', None) is not None:
+            yield
+            return
+        
+        self._local.pending = []
+        try:
+            yield
+        finally:
+            pending, self._local.pending = self._local.pending, None
+            self.track_predictions_bulk(pending)
+    
     def track_prediction(self, model_name, version, latency, tokens, success=True):
         """
         Track a prediction
@@ -35,22 +90,55 @@ class PerformanceTracker:
             tokens: Token count
             success: Whether prediction was successful
         """
-        version_id = self._get_version_id(model_name, version)
+        prediction = (model_name, version, latency, tokens, success)
+        pending = getattr(self._local, 'pending', None)
         
-        if not version_id:
-            logger.warning(f"Version not found: {model_name} v{version}")
-            return
+        if pending is not None:
+            pending.append(prediction)
+        else:
+            self.track_predictions_bulk([prediction])
+        
+        logger.debug("Tracked prediction: %s v%s", model_name, version)
+    
+    def track_predictions_bulk(self, predictions):
+        """
+        Track several predictions in one transaction
+        
+        Args:
+            predictions: List of (model_name, version, latency, tokens) or
+                (model_name, version, latency, tokens, success) tuples
+        """
+        version_ids = {}
+        rows = []
         
-        # Track latency
-        self._track_metric(version_id, 'latency', latency)
+        for prediction in predictions:
+            model_name, version, latency, tokens = prediction[:4]
+            success = prediction[4] if len(prediction) > 4 else True
+            
+            key = (model_name, version)
+            if key not in version_ids:
+                version_ids[key] = self._get_version_id(model_name, version)
+                if not version_ids[key]:
+                    logger.warning(f"Version not found: {model_name} v{version}")
+            
+            version_id = version_ids[key]
+            if not version_id:
+                continue
+            
+            rows.append((version_id, 'latency', latency))
+            rows.append((version_id, 'tokens', tokens))
+            rows.append((version_id, 'success', 1 if success else 0))
         
-        # Track tokens
-        self._track_metric(version_id, 'tokens', tokens)
+        if not rows:
+            return
         
-        # Track success/failure
-        self._track_metric(version_id, 'success', 1 if success else 0)
+        conn = get_pooled_connection(self.db_path)
         
-        logger.debug(f"Tracked prediction: {model_name} v{version}")
+        with conn:
+            conn.executemany('''
+                INSERT INTO metrics (version_id, metric_name, metric_value)
+                VALUES (?, ?, ?)
+            ''', rows)
     
     def get_metrics(self, model_name, version):
         """
@@ -68,61 +156,11 @@ class PerformanceTracker:
         if not version_id:
             return None
         
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        # Get latency metrics
-        cursor.execute('''
-            SELECT 
-                AVG(metric_value) as avg_latency,
-                MIN(metric_value) as min_latency,
-                MAX(metric_value) as max_latency
-            FROM metrics
-            WHERE version_id = ? AND metric_name = 'latency'
-        ''', (version_id,))
-        
-        latency_stats = cursor.fetchone()
-        
-        # Get token metrics
-        cursor.execute('''
-            SELECT 
-                AVG(metric_value) as avg_tokens,
-                SUM(metric_value) as total_tokens
-            FROM metrics
-            WHERE version_id = ? AND metric_name = 'tokens'
-        ''', (version_id,))
-        
-        token_stats = cursor.fetchone()
-        
-        # Get success rate
-        cursor.execute('''
-            SELECT 
-                COUNT(*) as total_requests,
-                SUM(metric_value) as successful_requests
-            FROM metrics
-            WHERE version_id = ? AND metric_name = 'success'
-        ''', (version_id,))
-        
-        success_stats = cursor.fetchone()
-        
-        conn.close()
-        
-        # Calculate success rate
-        success_rate = 0.0
-        if success_stats['total_requests'] > 0:
-            success_rate = (success_stats['successful_requests'] / success_stats['total_requests']) * 100
+        cursor = get_pooled_connection(self.db_path).cursor()
         
-        return {
-            'model_name': model_name,
-            'version': version,
-            'avg_latency': round(latency_stats['avg_latency'] or 0, 3),
-            'min_latency': round(latency_stats['min_latency'] or 0, 3),
-            'max_latency': round(latency_stats['max_latency'] or 0, 3),
-            'avg_tokens': round(token_stats['avg_tokens'] or 0, 1),
-            'total_tokens': int(token_stats['total_tokens'] or 0),
-            'total_requests': success_stats['total_requests'],
-            'success_rate': round(success_rate, 2)
-        }
+        stats = cursor.execute(self._SQL_GET_METRICS, (version_id,)).fetchone()
+        
+        return self._build_metrics(model_name, version, stats)
     
     def compare_versions(self, model_name, version1, version2):
         """
@@ -150,75 +188,52 @@ class PerformanceTracker:
             'success_rate_diff': metrics2['success_rate'] - metrics1['success_rate']
         }
     
-    def get_version_ranking(self, model_name):
+    def get_version_ranking(self, model_name, limit=None):
         """
         Rank versions by performance
         
         Args:
             model_name: Model name
+            limit: Maximum number of versions (None for all)
             
         Returns:
             List of versions ranked by performance
         """
-        # Get all versions
-        versions = self._get_all_versions(model_name)
+        cursor = get_pooled_connection(self.db_path).cursor()
         
-        # Get metrics for each version
-        version_metrics = []
-        for version in versions:
-            metrics = self.get_metrics(model_name, version)
-            if metrics and metrics['total_requests'] > 0:
-                # Calculate performance score (lower latency + higher success rate = better)
-                score = (1 / metrics['avg_latency']) * (metrics['success_rate'] / 100)
-                metrics['performance_score'] = round(score, 3)
-                version_metrics.append(metrics)
+        # Metrics, filtering and ordering for every version in one query
+        # (a negative LIMIT means no limit in SQLite)
+        cursor.execute(self._SQL_VERSION_RANKING, (model_name, -1 if limit is None else limit))
         
-        # Sort by performance score
-        version_metrics.sort(key=lambda x: x['performance_score'], reverse=True)
+        version_metrics = []
+        for stats in cursor:
+            metrics = self._build_metrics(model_name, stats[0], stats)
+            metrics['performance_score'] = metrics['success_rate'] / 100 / metrics['avg_latency']
+            version_metrics.append(metrics)
         
         return version_metrics
     
-    def _get_version_id(self, model_name, version):
-        """Get version ID"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.id FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ? AND v.version = ?
-        ''', (model_name, version))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result['id'] if result else None
-    
-    def _track_metric(self, version_id, metric_name, metric_value):
-        """Track a metric"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO metrics (version_id, metric_name, metric_value)
-            VALUES (?, ?, ?)
-        ''', (version_id, metric_name, metric_value))
-        
-        conn.commit()
-        conn.close()
+    def _build_metrics(self, model_name, version, stats):
+        """Build the metrics dictionary from a summary row"""
+        # The metric columns always end the row (ranking rows lead with the
+        # version), so unpack them by position
+        (avg_latency, min_latency, max_latency, avg_tokens,
+         total_tokens, total_requests, success_rate) = stats[-7:]
+        
+        # Values are left unrounded so comparisons stay exact; callers format
+        # them for display
+        return {
+            'model_name': model_name,
+            'version': version,
+            'avg_latency': avg_latency,
+            'min_latency': min_latency,
+            'max_latency': max_latency,
+            'avg_tokens': avg_tokens,
+            'total_tokens': total_tokens,
+            'total_requests': total_requests,
+            'success_rate': success_rate
+        }
     
-    def _get_all_versions(self, model_name):
-        """Get all versions for a model"""
-        conn = get_connection(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT v.version FROM versions v
-            JOIN models m ON v.model_id = m.id
-            WHERE m.name = ?
-        ''', (model_name,))
-        
-        results = cursor.fetchall()
-        conn.close()
-        
-        return [row['version'] for row in results]
+    def _get_version_id(self, model_name, version):
+        """Get version ID (cached in the registry until the next write)"""
+        return get_version_id(self.db_path, model_name, version)
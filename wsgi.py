@@ -0,0 +1,8 @@
+"""
+WSGI Entry Point
+Exposes the Flask app to production servers such as gunicorn
+"""
+
+from api.app import app
+
+__all__ = ['app']